@@ -0,0 +1,345 @@
+"""
+Async Docker Engine API client.
+
+Talks to the daemon over its unix socket with httpx, so container actions
+can be awaited from async handlers instead of holding a threadpool worker
+for the length of a `docker stop`. Errors are raised as the docker SDK's
+exception types so handlers keep the same except clauses as the sync path.
+Calls go through the docker_daemon circuit breaker and CLI runs through
+docker_cli, so an outage fails fast with CircuitOpen.
+"""
+import asyncio
+import json
+import os
+import struct
+from contextlib import asynccontextmanager
+import httpx
+from docker.errors import APIError, DockerException, NotFound
+import circuit_breaker
+import instrumentation
+
+DOCKER_HOST = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+API_VERSION = os.getenv("DOCKER_API_VERSION", "v1.41")
+# Concurrent connections to the daemon shared by all requests
+MAX_CONNECTIONS = int(os.getenv("DOCKER_ASYNC_MAX_CONNECTIONS", "100"))
+REQUEST_TIMEOUT = float(os.getenv("DOCKER_TIMEOUT", "30"))
+# Streams (logs, stats) may stay idle indefinitely; only connecting is bounded
+STREAM_TIMEOUT = httpx.Timeout(None, connect=REQUEST_TIMEOUT)
+
+
+class AsyncDockerClient:
+    """Minimal async wrapper around the Docker Engine HTTP API"""
+
+    def __init__(self, host: str = DOCKER_HOST):
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        if host.startswith("unix://"):
+            transport = httpx.AsyncHTTPTransport(uds=host[len("unix://"):], limits=limits)
+            base_url = "http://docker"
+        else:
+            transport = httpx.AsyncHTTPTransport(limits=limits)
+            base_url = host.replace("tcp://", "http://", 1)
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            base_url=f"{base_url}/{API_VERSION}",
+            timeout=REQUEST_TIMEOUT
+        )
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, params=None, body=None, timeout=None):
+        try:
+            # Any HTTP answer, errors included, means the daemon is up
+            with circuit_breaker.docker_daemon.guard(), instrumentation.timed("docker"):
+                response = await self._client.request(
+                    method, path,
+                    params=params,
+                    json=body,
+                    timeout=timeout if timeout is not None else REQUEST_TIMEOUT
+                )
+        except httpx.HTTPError as e:
+            raise DockerException(f"Docker daemon request failed: {e!r}")
+        if response.status_code == 404:
+            raise NotFound(_error_message(response))
+        if response.status_code >= 400:
+            raise APIError(_error_message(response))
+        return response
+
+    async def ping(self):
+        await self._request("GET", "/_ping")
+        return True
+
+    async def list_containers(self, all: bool = True, filters: dict = None):
+        params = {"all": "1" if all else "0"}
+        if filters:
+            params["filters"] = _encode_filters(filters)
+        response = await self._request("GET", "/containers/json", params=params)
+        return response.json()
+
+    async def inspect(self, name: str):
+        response = await self._request("GET", f"/containers/{name}/json")
+        return response.json()
+
+    async def start(self, name: str):
+        """Start a container; returns False if it was already running"""
+        response = await self._request("POST", f"/containers/{name}/start")
+        return response.status_code != 304
+
+    async def stop(self, name: str, timeout: int = 10):
+        """Stop a container; returns False if it was already stopped"""
+        response = await self._request(
+            "POST", f"/containers/{name}/stop",
+            params={"t": timeout},
+            timeout=REQUEST_TIMEOUT + timeout
+        )
+        return response.status_code != 304
+
+    async def restart(self, name: str, timeout: int = 10):
+        await self._request(
+            "POST", f"/containers/{name}/restart",
+            params={"t": timeout},
+            timeout=REQUEST_TIMEOUT + timeout
+        )
+
+    async def remove(self, name: str, force: bool = True):
+        await self._request("DELETE", f"/containers/{name}", params={"force": "1" if force else "0"})
+
+    async def pull(self, image: str):
+        repository, tag = image, "latest"
+        if ":" in image.rsplit("/", 1)[-1]:
+            repository, tag = image.rsplit(":", 1)
+        # The pull progress stream has to be drained for the pull to finish
+        async with self._client.stream(
+            "POST", "/images/create",
+            params={"fromImage": repository, "tag": tag},
+            timeout=None
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise APIError(_error_message(response))
+            async for _ in response.aiter_bytes():
+                pass
+
+    async def create(self, name: str, image: str, ports: dict = None, environment: dict = None,
+                     labels: dict = None, network: str = None, restart_policy: str = None):
+        """Create a container; ports maps container ports ("80/tcp") to host ports"""
+        host_config = {}
+        if ports:
+            host_config["PortBindings"] = {port: [{"HostPort": str(host_port)}] for port, host_port in ports.items()}
+        if network:
+            host_config["NetworkMode"] = network
+        if restart_policy:
+            host_config["RestartPolicy"] = {"Name": restart_policy}
+        body = {
+            "Image": image,
+            "Env": [f"{key}={value}" for key, value in (environment or {}).items()],
+            "Labels": labels or {},
+            "ExposedPorts": {port: {} for port in (ports or {})},
+            "HostConfig": host_config
+        }
+        try:
+            response = await self._request("POST", "/containers/create", params={"name": name}, body=body)
+        except NotFound:
+            # Image is not present locally; pull it like `docker run` does
+            await self.pull(image)
+            response = await self._request("POST", "/containers/create", params={"name": name}, body=body)
+        return response.json()["Id"]
+
+    async def run(self, name: str, image: str, **kwargs):
+        """Create and start a container, returning its id"""
+        container_id = await self.create(name, image, **kwargs)
+        await self.start(container_id)
+        return container_id
+
+    @asynccontextmanager
+    async def _stream(self, method: str, path: str, params=None):
+        breaker = circuit_breaker.docker_daemon
+        breaker.allow()
+        try:
+            async with self._client.stream(method, path, params=params, timeout=STREAM_TIMEOUT) as response:
+                # Only opening the stream is a call; it may then stay open for hours
+                breaker.succeeded()
+                if response.status_code >= 400:
+                    await response.aread()
+                    if response.status_code == 404:
+                        raise NotFound(_error_message(response))
+                    raise APIError(_error_message(response))
+                yield response
+        except httpx.HTTPError as e:
+            breaker.failed(e)
+            raise DockerException(f"Docker daemon request failed: {e!r}")
+        except BaseException:
+            breaker.abandoned()
+            raise
+
+    async def logs(self, name: str, follow: bool = False, tail: str = "all", since: int = None, until: float = None):
+        """Yield log output as decoded text chunks, stdout and stderr interleaved"""
+        tty = (await self.inspect(name)).get("Config", {}).get("Tty", False)
+        params = {"stdout": "1", "stderr": "1", "follow": "1" if follow else "0", "tail": tail}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        async with self._stream("GET", f"/containers/{name}/logs", params=params) as response:
+            if tty:
+                # TTY containers send a raw stream
+                async for chunk in response.aiter_text():
+                    yield chunk
+                return
+            # Otherwise frames are multiplexed: 8-byte header (stream, 0, 0, 0, size:uint32be)
+            buffer = b""
+            async for chunk in response.aiter_bytes():
+                buffer += chunk
+                while len(buffer) >= 8:
+                    size = struct.unpack(">I", buffer[4:8])[0]
+                    if len(buffer) < 8 + size:
+                        break
+                    yield buffer[8:8 + size].decode("utf-8", errors="replace")
+                    buffer = buffer[8 + size:]
+
+    async def stats(self, name: str):
+        """Yield raw stats samples (about one per second) until the stream is closed"""
+        async with self._stream("GET", f"/containers/{name}/stats", params={"stream": "1"}) as response:
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    async def stats_once(self, name: str, one_shot: bool = False):
+        """Fetch a single stats sample.
+
+        With one_shot the daemon answers immediately instead of waiting a
+        second to fill in precpu_stats, so CPU usage has to be derived from
+        two samples by the caller.
+        """
+        params = {"stream": "0"}
+        if one_shot:
+            params["one-shot"] = "1"
+        response = await self._request("GET", f"/containers/{name}/stats", params=params)
+        return response.json()
+
+
+def stats_counters(raw: dict):
+    """Raw cumulative counters from a /stats sample.
+
+    Returns (cpu_total, system_cpu, online_cpus, memory_usage, memory_limit,
+    network_rx, network_tx, block_read, block_write).
+    """
+    cpu_stats = raw.get("cpu_stats") or {}
+    cpu_usage = cpu_stats.get("cpu_usage") or {}
+    online_cpus = cpu_stats.get("online_cpus") or len(cpu_usage.get("percpu_usage") or []) or 1
+
+    memory_stats = raw.get("memory_stats") or {}
+    memory_detail = memory_stats.get("stats") or {}
+    # Page cache is reclaimable; `docker stats` leaves it out too
+    cache = memory_detail.get("inactive_file", memory_detail.get("cache", 0))
+    memory_usage = max(0, memory_stats.get("usage", 0) - cache)
+
+    networks = (raw.get("networks") or {}).values()
+    blkio = (raw.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+
+    return (
+        cpu_usage.get("total_usage", 0),
+        cpu_stats.get("system_cpu_usage", 0),
+        online_cpus,
+        memory_usage,
+        memory_stats.get("limit", 0),
+        sum(net.get("rx_bytes", 0) for net in networks),
+        sum(net.get("tx_bytes", 0) for net in networks),
+        sum(entry.get("value", 0) for entry in blkio if entry.get("op", "").lower() == "read"),
+        sum(entry.get("value", 0) for entry in blkio if entry.get("op", "").lower() == "write"),
+    )
+
+
+def summarize_stats(raw: dict):
+    """Reduce a raw /stats sample to CPU, memory, network and block I/O figures"""
+    (cpu_total, system_cpu, online_cpus, memory_usage, memory_limit,
+     network_rx, network_tx, block_read, block_write) = stats_counters(raw)
+    precpu_stats = raw.get("precpu_stats") or {}
+    cpu_delta = cpu_total - (precpu_stats.get("cpu_usage") or {}).get("total_usage", 0)
+    system_delta = system_cpu - precpu_stats.get("system_cpu_usage", 0)
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100.0 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+    return {
+        "cpu_percent": round(cpu_percent, 2),
+        "memory_usage": memory_usage,
+        "memory_limit": memory_limit,
+        "memory_percent": round(memory_usage / memory_limit * 100.0, 2) if memory_limit else 0.0,
+        "network_rx": network_rx,
+        "network_tx": network_tx,
+        "block_read": block_read,
+        "block_write": block_write,
+        "read_at": raw.get("read")
+    }
+
+
+def _encode_filters(filters: dict):
+    return json.dumps({key: value if isinstance(value, list) else [value] for key, value in filters.items()})
+
+
+def _error_message(response):
+    try:
+        return response.json().get("message", response.text)
+    except ValueError:
+        return response.text or f"HTTP {response.status_code}"
+
+
+class CLIResult:
+    def __init__(self, returncode: int, stdout: str, stderr: str):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+async def run_cli(*args, timeout: float = 15):
+    """Run a docker CLI command without blocking the event loop"""
+    breaker = circuit_breaker.docker_cli
+    breaker.allow()
+    try:
+        with instrumentation.timed("docker"):
+            process = await asyncio.create_subprocess_exec(
+                "docker", *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
+    except Exception as e:
+        breaker.failed(e)
+        raise
+    except BaseException:
+        breaker.abandoned()
+        raise
+    result = CLIResult(process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace"))
+    if result.returncode != 0 and daemon_unreachable(result.stderr):
+        # The CLI ran but could not reach its daemon: as good as not running
+        breaker.failed(result.stderr.strip())
+    else:
+        breaker.succeeded()
+    return result
+
+
+def daemon_unreachable(stderr: str):
+    """True if docker CLI output says the daemon could not be reached"""
+    return "Cannot connect to the Docker daemon" in stderr or "error during connect" in stderr
+
+
+_client = None
+
+
+def get_async_docker():
+    """FastAPI dependency returning the process-wide async client"""
+    global _client
+    if _client is None:
+        _client = AsyncDockerClient()
+    return _client
+
+
+async def close_async_docker():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
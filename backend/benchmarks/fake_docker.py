@@ -0,0 +1,258 @@
+"""
+In-process fake of the Docker Engine API for benchmarks.
+
+Serves the subset of endpoints the backend uses (listing, inspect,
+start/stop/restart/remove/create, one-shot stats, the events stream and
+version/ping) over a unix socket, for N simulated chatbot_ containers.
+Every request waits `latency` seconds (+/- `jitter`) to stand in for a
+real daemon. Both the docker SDK (registry) and the httpx client
+(async_docker) can talk to it by pointing DOCKER_HOST at the socket.
+
+It can also be run on its own, e.g. to point a dev backend at it:
+    python -m benchmarks.fake_docker --socket /tmp/fake-docker.sock --containers 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+_VERSIONED = re.compile(r"^/v[0-9.]+(/.*)$")
+
+
+class FakeDockerDaemon:
+    def __init__(self, containers: int = 1000, latency: float = 0.005, jitter: float = 0.5,
+                 running_ratio: float = 0.8, prefix: str = "chatbot_"):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        # Containers created per name, e.g. to spot duplicate provisioning
+        self.creates = {}
+        self._containers = {}
+        self._by_id = {}
+        self._subscribers = set()
+        now = int(time.time())
+        for i in range(1, containers + 1):
+            self._add(f"{prefix}{i}", "running" if random.random() < running_ratio else "exited", now - i)
+        self.app = Starlette(routes=[
+            Route("/_ping", self.ping),
+            Route("/_bench/stats", self.bench_stats),
+            Route("/version", self.version),
+            Route("/info", self.version),
+            Route("/events", self.events),
+            Route("/images/json", self.images),
+            Route("/containers/json", self.list_containers),
+            Route("/containers/create", self.create, methods=["POST"]),
+            Route("/containers/{name}/json", self.inspect),
+            Route("/containers/{name}/start", self.start, methods=["POST"]),
+            Route("/containers/{name}/stop", self.stop, methods=["POST"]),
+            Route("/containers/{name}/restart", self.restart, methods=["POST"]),
+            Route("/containers/{name}/stats", self.stats),
+            Route("/containers/{name}", self.remove, methods=["DELETE"]),
+        ])
+
+    # --- state ---------------------------------------------------------
+
+    def _add(self, name, state, created=None):
+        container_id = uuid.uuid4().hex + uuid.uuid4().hex
+        self._containers[name] = {
+            "Id": container_id,
+            "Names": [f"/{name}"],
+            "Image": "nginx:alpine",
+            "ImageID": "sha256:" + "0" * 64,
+            "Command": "nginx -g 'daemon off;'",
+            "Created": created or int(time.time()),
+            "State": state,
+            "Status": "Up 1 hour" if state == "running" else "Exited (0) 1 hour ago",
+            "Ports": [{"PrivatePort": 80, "Type": "tcp"}],
+            "Labels": {},
+        }
+        self._by_id[container_id] = name
+        return self._containers[name]
+
+    def _find(self, name_or_id):
+        if name_or_id in self._containers:
+            return self._containers[name_or_id]
+        for container_id, name in self._by_id.items():
+            if container_id.startswith(name_or_id):
+                return self._containers[name]
+        return None
+
+    def _emit(self, action, container):
+        event = {
+            "Type": "container",
+            "Action": action,
+            "status": action,
+            "id": container["Id"],
+            "Actor": {"ID": container["Id"], "Attributes": {"name": container["Names"][0].lstrip("/")}},
+            "time": int(time.time()),
+            "timeNano": time.time_ns(),
+        }
+        for queue in list(self._subscribers):
+            queue.put_nowait(event)
+
+    async def _delay(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    # --- endpoints -----------------------------------------------------
+
+    async def ping(self, request: Request):
+        return Response("OK", media_type="text/plain")
+
+    async def bench_stats(self, request: Request):
+        return JSONResponse({"requests": self.requests, "containers": len(self._containers), "creates": self.creates})
+
+    async def version(self, request: Request):
+        return JSONResponse({"ApiVersion": "1.41", "MinAPIVersion": "1.12", "Version": "24.0.0-fake"})
+
+    async def images(self, request: Request):
+        await self._delay()
+        return JSONResponse([{"Id": "sha256:" + "0" * 64, "RepoTags": ["nginx:alpine"]}])
+
+    async def list_containers(self, request: Request):
+        await self._delay()
+        filters = json.loads(request.query_params.get("filters") or "{}")
+        show_all = request.query_params.get("all") in ("1", "true", "True")
+        names = filters.get("name") or []
+        ids = filters.get("id") or []
+        result = []
+        for name, container in self._containers.items():
+            if not show_all and container["State"] != "running":
+                continue
+            if names and not any(fragment in name for fragment in names):
+                continue
+            if ids and not any(container["Id"].startswith(fragment) for fragment in ids):
+                continue
+            result.append(container)
+        return JSONResponse(result)
+
+    async def inspect(self, request: Request):
+        await self._delay()
+        container = self._find(request.path_params["name"])
+        if container is None:
+            return JSONResponse({"message": "No such container"}, status_code=404)
+        return JSONResponse({
+            "Id": container["Id"],
+            "Name": container["Names"][0],
+            "Created": container["Created"],
+            "State": {"Status": container["State"], "Running": container["State"] == "running"},
+            "Config": {"Image": container["Image"], "Tty": False},
+        })
+
+    async def _transition(self, request: Request, state, action, noop_state=None):
+        await self._delay()
+        container = self._find(request.path_params["name"])
+        if container is None:
+            return JSONResponse({"message": "No such container"}, status_code=404)
+        if noop_state and container["State"] == noop_state:
+            return Response(status_code=304)
+        container["State"] = state
+        container["Status"] = "Up 1 second" if state == "running" else "Exited (0) 1 second ago"
+        self._emit(action, container)
+        return Response(status_code=204)
+
+    async def start(self, request: Request):
+        return await self._transition(request, "running", "start", noop_state="running")
+
+    async def stop(self, request: Request):
+        return await self._transition(request, "exited", "stop", noop_state="exited")
+
+    async def restart(self, request: Request):
+        return await self._transition(request, "running", "restart")
+
+    async def remove(self, request: Request):
+        await self._delay()
+        container = self._find(request.path_params["name"])
+        if container is None:
+            return JSONResponse({"message": "No such container"}, status_code=404)
+        name = container["Names"][0].lstrip("/")
+        del self._containers[name]
+        del self._by_id[container["Id"]]
+        self._emit("destroy", container)
+        return Response(status_code=204)
+
+    async def create(self, request: Request):
+        await self._delay()
+        name = request.query_params.get("name")
+        if name in self._containers:
+            return JSONResponse({"message": f"Conflict. The container name \"/{name}\" is already in use"}, status_code=409)
+        container = self._add(name, "created")
+        self.creates[name] = self.creates.get(name, 0) + 1
+        self._emit("create", container)
+        return JSONResponse({"Id": container["Id"], "Warnings": []}, status_code=201)
+
+    async def stats(self, request: Request):
+        await self._delay()
+        container = self._find(request.path_params["name"])
+        if container is None:
+            return JSONResponse({"message": "No such container"}, status_code=404)
+        now = time.time()
+        usage = int(now * 1e9 * random.uniform(0.001, 0.01))
+        return JSONResponse({
+            "read": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "cpu_stats": {"cpu_usage": {"total_usage": usage}, "system_cpu_usage": int(now * 1e9), "online_cpus": 4},
+            "precpu_stats": {},
+            "memory_stats": {"usage": random.randint(20, 200) * 2 ** 20, "limit": 2 * 2 ** 30, "stats": {}},
+            "networks": {"eth0": {"rx_bytes": int(now) % 10 ** 6, "tx_bytes": int(now) % 10 ** 5}},
+            "blkio_stats": {"io_service_bytes_recursive": []},
+        })
+
+    async def events(self, request: Request):
+        until = request.query_params.get("until")
+        deadline = float(until) if until else None
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+
+        async def body():
+            try:
+                while True:
+                    timeout = None if deadline is None else deadline - time.time()
+                    if timeout is not None and timeout <= 0:
+                        return
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        return
+                    yield json.dumps(event) + "\n"
+            finally:
+                self._subscribers.discard(queue)
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    # --- server --------------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        # Accept both /v1.41/containers/json and /containers/json
+        if scope["type"] == "http":
+            match = _VERSIONED.match(scope["path"])
+            if match:
+                scope = dict(scope, path=match.group(1))
+        await self.app(scope, receive, send)
+
+    def serve(self, socket_path: str):
+        """Serve on a unix socket until interrupted"""
+        uvicorn.run(self, uds=socket_path, log_level="warning", lifespan="off")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Docker Engine API on a unix socket")
+    parser.add_argument("--socket", required=True, help="unix socket path to listen on")
+    parser.add_argument("--containers", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    args = parser.parse_args()
+    daemon = FakeDockerDaemon(args.containers, latency=args.latency_ms / 1000, jitter=args.jitter)
+    daemon.serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
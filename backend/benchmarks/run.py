@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+API Load Test
+Boots the FastAPI app against SQLite and a fake Docker daemon, drives a
+dashboard-like traffic mix at it and reports throughput and latency
+percentiles per endpoint. The API and the daemon run as separate
+processes so the load generator does not compete with them for the GIL.
+
+    cd backend
+    python -m benchmarks.run --containers 5000 --duration 30 --concurrency 50
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --baseline results.json --max-regression 0.25
+
+With --baseline the run fails (exit code 1) when an endpoint's p99 latency
+grows, or its throughput drops, by more than --max-regression.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin123"
+
+# (name, weight); roughly what a few open dashboards generate
+TRAFFIC_MIX = [
+    ("stats", 20),
+    ("stats_cached", 20),
+    ("containers_page", 25),
+    ("containers_large_page", 5),
+    ("containers_running", 5),
+    ("users_page", 15),
+    ("health", 5),
+    ("bulk_stop_start", 3),
+    ("login", 1),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--containers", type=int, default=2000, help="simulated chatbot_ containers (and users)")
+    parser.add_argument("--latency-ms", type=float, default=5, help="fake daemon latency per request")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency jitter as a fraction of --latency-ms")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load after warm-up")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=25, help="concurrent client workers")
+    parser.add_argument("--bulk-size", type=int, default=20, help="containers per bulk action")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p99/throughput regression vs baseline")
+    return parser.parse_args()
+
+
+def configure_environment(workdir, args):
+    """Point the app at SQLite and the fake daemon; must run before the app is imported"""
+    os.environ["DATABASE_TEST_MODE"] = "1"
+    os.environ["DATABASE_TEST_PATH"] = os.path.join(workdir, "benchmark.db")
+    os.environ["DOCKER_HOST"] = "unix://" + os.path.join(workdir, "docker.sock")
+    os.environ.setdefault("METRICS_INTERVAL", "3600")
+    os.environ.setdefault("TENANT_PORT_RANGE_END", str(20000 + max(args.containers * 2, 10000)))
+
+
+def seed_database(count):
+    from sqlalchemy import insert
+    import database
+    import models
+    import schema
+    from routers import auth
+
+    schema.upgrade()
+    db = database.SessionLocal()
+    try:
+        auth.create_default_admin(db)
+        db.execute(insert(models.User), [{
+            "name": f"Bench User {i}",
+            "email": f"bench{i}@example.com",
+            "phone": "0000000000",
+            "username": f"bench_user_{i}",
+            "password": "x",
+            "company_name": f"Company {i % 50}",
+            "subdomain": f"bench-{i}",
+        } for i in range(1, count + 1)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(process, url, transport=None, timeout=60):
+    import httpx
+
+    deadline = time.time() + timeout
+    with httpx.Client(transport=transport, timeout=1) as client:
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{' '.join(process.args)} exited with code {process.returncode}")
+            try:
+                if client.get(url).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def start_daemon(socket_path, args):
+    import httpx
+
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_docker", "--socket", socket_path,
+        "--containers", str(args.containers), "--latency-ms", str(args.latency_ms), "--jitter", str(args.jitter)
+    ], cwd=BACKEND_DIR)
+    wait_until_ready(process, "http://docker/_ping", transport=httpx.HTTPTransport(uds=socket_path))
+    return process
+
+
+def start_api(port):
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ], cwd=BACKEND_DIR)
+    wait_until_ready(process, f"http://127.0.0.1:{port}/health")
+    return process
+
+
+def daemon_requests(socket_path):
+    import httpx
+
+    with httpx.Client(transport=httpx.HTTPTransport(uds=socket_path)) as client:
+        return client.get("http://docker/_bench/stats").json()["requests"]
+
+
+def wait_until_quiet(socket_path, quiet=2.0, timeout=120):
+    """Let startup work (registry sync, first metrics sweep) finish before measuring"""
+    deadline = time.time() + timeout
+    last, last_change = daemon_requests(socket_path), time.time()
+    while time.time() < deadline and time.time() - last_change < quiet:
+        time.sleep(0.25)
+        current = daemon_requests(socket_path)
+        if current != last:
+            last, last_change = current, time.time()
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, name, seconds, ok, status):
+        if not self.recording:
+            return
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+            self.statuses[name][status or "exception"] += 1
+
+    def summary(self, elapsed):
+        results = {}
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+            pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+            results[name] = {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(pick(0.50), 2),
+                "p90_ms": round(pick(0.90), 2),
+                "p99_ms": round(pick(0.99), 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "errors_by_status": dict(self.statuses[name]),
+            }
+        return results
+
+
+class Dashboard:
+    """One simulated admin client"""
+
+    def __init__(self, client, recorder, args, token=None):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.token = token
+        self.stats_etag = None
+        self.cursor = None
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def request(self, name, method, url, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok, status = response.status_code in expected, str(response.status_code)
+        except Exception as e:
+            print(f"   {name}: {type(e).__name__}: {e}")
+            response, ok, status = None, False, None
+        self.recorder.add(name, time.perf_counter() - started, ok, status)
+        return response
+
+    async def login(self):
+        response = await self.request("login", "POST", "/api/admin/login",
+                                      json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["token"]
+
+    async def stats(self):
+        response = await self.request("stats", "GET", "/api/admin/stats", headers=self.headers)
+        if response is not None:
+            self.stats_etag = response.headers.get("etag")
+
+    async def stats_cached(self):
+        if not self.stats_etag:
+            return await self.stats()
+        headers = dict(self.headers, **{"If-None-Match": self.stats_etag})
+        await self.request("stats_cached", "GET", "/api/admin/stats", expected=(200, 304), headers=headers)
+
+    async def containers_page(self):
+        params = {"limit": 50}
+        if self.cursor:
+            params["cursor"] = self.cursor
+        response = await self.request("containers_page", "GET", "/api/containers/", headers=self.headers, params=params)
+        if response is not None and response.status_code == 200:
+            # Page forward like someone scrolling, and start over at the end
+            self.cursor = response.json().get("next_cursor")
+
+    async def containers_large_page(self):
+        await self.request("containers_large_page", "GET", "/api/containers/", headers=self.headers, params={"limit": 500})
+
+    async def containers_running(self):
+        await self.request("containers_running", "GET", "/api/containers/", headers=self.headers,
+                           params={"limit": 50, "status": "running"})
+
+    async def users_page(self):
+        await self.request("users_page", "GET", "/api/users/", headers=self.headers,
+                           params={"limit": 50, "sort": "created_at", "order": "desc"})
+
+    async def health(self):
+        await self.request("health", "GET", "/health")
+
+    async def bulk_stop_start(self):
+        names = [f"chatbot_{i}" for i in random.sample(range(1, self.args.containers + 1), min(self.args.bulk_size, self.args.containers))]
+        for action in ("stop", "start"):
+            await self.request("bulk_" + action, "POST", "/api/containers/bulk", headers=self.headers,
+                               json={"action": action, "names": names, "concurrency": 10, "stop_timeout": 0})
+
+    async def run(self, stop_at):
+        names, weights = zip(*TRAFFIC_MIX)
+        while time.time() < stop_at:
+            await getattr(self, random.choices(names, weights)[0])()
+
+
+async def drive(base_url, args):
+    import httpx
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # Sessions share one token, as tabs of a logged-in dashboard would
+        first = Dashboard(client, recorder, args)
+        await first.login()
+        if first.token is None:
+            raise RuntimeError("Could not log in as the default admin")
+        stop_at = time.time() + args.warmup + args.duration
+        workers = [
+            asyncio.create_task(Dashboard(client, recorder, args, first.token).run(stop_at))
+            for _ in range(args.concurrency)
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        started = time.time()
+        await asyncio.gather(*workers)
+        elapsed = time.time() - started
+    return recorder.summary(elapsed), elapsed
+
+
+def print_results(results, elapsed):
+    total = sum(row["count"] for row in results.values())
+    print(f"\n{'endpoint':<24}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print("-" * 89)
+    for name, row in results.items():
+        print(f"{name:<24}{row['count']:>8}{row['errors']:>8}{row['rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p90_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print("-" * 89)
+    print(f"{'total':<24}{total:>8}{sum(row['errors'] for row in results.values()):>8}{round(total / elapsed, 1):>9}")
+
+
+def compare(results, baseline, max_regression):
+    """Regressions against a baseline run, as printable lines"""
+    regressions = []
+    for name, before in baseline.get("endpoints", {}).items():
+        after = results.get(name)
+        if not after:
+            continue
+        # Ignore sub-millisecond noise on very fast endpoints
+        if after["p99_ms"] > max(before["p99_ms"] * (1 + max_regression), before["p99_ms"] + 1):
+            regressions.append(f"{name}: p99 {before['p99_ms']}ms -> {after['p99_ms']}ms")
+        if after["rps"] < before["rps"] * (1 - max_regression):
+            regressions.append(f"{name}: throughput {before['rps']}/s -> {after['rps']}/s")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {after['errors']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="admin-dashboard-bench-")
+    configure_environment(workdir, args)
+    socket_path = os.environ["DOCKER_HOST"][len("unix://"):]
+
+    print("=" * 50)
+    print("🚀 API Load Test")
+    print("=" * 50)
+    print(f"Containers: {args.containers}, daemon latency: {args.latency_ms}ms, "
+          f"workers: {args.concurrency}, duration: {args.duration}s")
+
+    seed_database(args.containers)
+    daemon = start_daemon(socket_path, args)
+    try:
+        port = free_port()
+        api = start_api(port)
+        try:
+            wait_until_quiet(socket_path)
+            results, elapsed = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+        finally:
+            stop(api)
+        served = daemon_requests(socket_path)
+    finally:
+        stop(daemon)
+
+    print_results(results, elapsed)
+    print(f"\nFake daemon served {served} requests")
+    report = {"config": vars(args), "elapsed": round(elapsed, 2), "endpoints": results}
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        print("\n" + "=" * 50)
+        for key in ("containers", "latency_ms", "concurrency", "bulk_size"):
+            if baseline.get("config", {}).get(key) != getattr(args, key):
+                print(f"⚠️  Baseline was run with {key}={baseline.get('config', {}).get(key)}, this run with {getattr(args, key)}")
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.baseline}")
+            for line in regressions:
+                print(f"   ✗ {line}")
+        else:
+            print(f"🎉 No regressions against {args.baseline}")
+        print("=" * 50)
+        return not regressions
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,176 @@
+"""
+Circuit breakers for the Docker backends.
+
+When the daemon is down every call to it fails, but only after a connect
+attempt, a timeout or a spawned `docker` process. A breaker counts
+consecutive failures and, once DOCKER_BREAKER_FAILURE_THRESHOLD is
+reached, opens: calls fail at once with CircuitOpen for
+DOCKER_BREAKER_RECOVERY_TIMEOUT seconds. After that it is half-open and
+lets DOCKER_BREAKER_HALF_OPEN_CALLS calls through as probes; a success
+closes it, a failure opens it again.
+
+There is one breaker per backend, shared by every caller of it:
+
+    docker_daemon   Engine API calls (docker SDK and the async client)
+    docker_cli      `docker` CLI processes
+
+The docker_client health thread reports its pings to docker_daemon
+without asking permission, so a recovered daemon closes the breaker
+without waiting for a request to probe it.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from docker.errors import APIError, DockerException
+
+FAILURE_THRESHOLD = int(os.getenv("DOCKER_BREAKER_FAILURE_THRESHOLD", "5"))
+RECOVERY_TIMEOUT = float(os.getenv("DOCKER_BREAKER_RECOVERY_TIMEOUT", "30"))
+HALF_OPEN_CALLS = int(os.getenv("DOCKER_BREAKER_HALF_OPEN_CALLS", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(DockerException):
+    """Raised instead of calling a backend whose breaker is open.
+
+    A DockerException, so existing handlers treat it like any other
+    daemon failure (and fall back to the CLI, whose breaker may be closed).
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 recovery_timeout: float = RECOVERY_TIMEOUT, half_open_calls: int = HALF_OPEN_CALLS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._last_error = None
+        self._rejected = 0
+        self._opened = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register callback(state), called on the thread that changed the state"""
+        self._listeners.append(callback)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self._rejected += 1
+            retry_after = self.recovery_timeout - (time.monotonic() - self._opened_at) if state == OPEN else 1
+        raise CircuitOpen(self.name, max(retry_after, 1))
+
+    def succeeded(self):
+        with self._lock:
+            changed = self._state != CLOSED
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+        if changed:
+            print(f"Circuit {self.name} closed")
+            self._notify(CLOSED)
+
+    def failed(self, error=None):
+        with self._lock:
+            self._last_error = str(error) if error is not None else None
+            self._failures += 1
+            state = self._current_state()
+            if state == OPEN or (state == CLOSED and self._failures < self.failure_threshold):
+                return
+            # Threshold reached, or a half-open probe failed
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._opened += 1
+        print(f"Circuit {self.name} opened after {self._failures} consecutive failures: {error}")
+        self._notify(OPEN)
+
+    def abandoned(self):
+        """A probe ended without an answer either way (e.g. it was cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self, is_failure=None):
+        """Run the block as a call through the breaker.
+
+        Exceptions count as failures unless is_failure(exc) says otherwise
+        (an HTTP 404 from the daemon means it is up).
+        """
+        self.allow()
+        try:
+            yield
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.failed(e)
+            else:
+                self.succeeded()
+            raise
+        except BaseException:
+            self.abandoned()
+            raise
+        else:
+            self.succeeded()
+
+    def _notify(self, state):
+        for callback in self._listeners:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Circuit {self.name} listener failed: {e}")
+
+    def status(self):
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in": round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 1) if state == OPEN else None,
+                "times_opened": self._opened,
+                "rejected_calls": self._rejected,
+                "last_error": self._last_error
+            }
+
+
+def daemon_failure(exc):
+    """is_failure for docker SDK calls: an APIError is an answer from a running daemon"""
+    return not isinstance(exc, APIError)
+
+
+docker_daemon = CircuitBreaker("docker_daemon")
+docker_cli = CircuitBreaker("docker_cli")
+
+
+def status():
+    return {breaker.name: breaker.status() for breaker in (docker_daemon, docker_cli)}
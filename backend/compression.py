@@ -0,0 +1,207 @@
+"""
+Response compression.
+
+Listing responses are large, repetitive JSON and compress by an order of
+magnitude. CompressionMiddleware picks the first algorithm in
+COMPRESSION_ALGORITHMS that the client accepts (Brotli needs the optional
+brotli package; gzip is always available) and compresses responses of a
+compressible type once they reach COMPRESSION_MIN_SIZE bytes. Streamed
+responses are compressed chunk by chunk after the first
+COMPRESSION_MIN_SIZE bytes have been buffered; event streams are never
+touched, since buffering would delay events.
+
+A compressed body is a different representation from the identity one,
+so its strong ETag gets an encoding suffix ("abc" -> "abc-gzip"). The
+suffix is removed from If-None-Match before the handler sees it and put
+back on the 304, so handlers only deal with their own tags.
+"""
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+import instrumentation
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Preference order; "none" disables compression
+COMPRESSION_ALGORITHMS = [name.strip() for name in os.getenv("COMPRESSION_ALGORITHMS", "br,gzip").split(",") if name.strip()]
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 4-5 is close to gzip -6 in CPU and noticeably smaller
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def available_algorithms():
+    return [name for name in COMPRESSION_ALGORITHMS if name == "gzip" or (name == "br" and brotli is not None)]
+
+
+def _accepted(accept_encoding: str):
+    """Codings the client accepts (q > 0)"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def negotiate(accept_encoding: str, algorithms=None):
+    accepted = _accepted(accept_encoding)
+    for name in algorithms if algorithms is not None else available_algorithms():
+        if name in accepted or "*" in accepted:
+            return name
+    return None
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits=31 writes the gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _strip_etag_suffixes(value: str, suffix: str):
+    return ",".join(
+        tag[:-len(suffix) - 1] + '"' if tag.endswith(suffix + '"') else tag
+        for tag in (part.strip() for part in value.split(","))
+    )
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, algorithms=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.algorithms = algorithms if algorithms is not None else available_algorithms()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.algorithms:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = negotiate(headers.get("accept-encoding", ""), self.algorithms)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        suffix = f"-{encoding}"
+        if_none_match = headers.get("if-none-match")
+        revalidating = bool(if_none_match) and suffix + '"' in if_none_match
+        if revalidating:
+            # Same scope dict, so the route the router records stays visible to outer middleware
+            scope["headers"] = [
+                (name, _strip_etag_suffixes(value.decode("latin-1"), suffix).encode("latin-1")) if name == b"if-none-match" else (name, value)
+                for name, value in scope["headers"]
+            ]
+        await _Responder(self.app, encoding, self.minimum_size, revalidating)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app, encoding, minimum_size, revalidating):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        # If-None-Match named the compressed variant
+        self.revalidating = revalidating
+        self.start = None
+        self.buffer = []
+        self.buffered = 0
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _tag_etag(self, headers):
+        etag = headers.get("etag")
+        if etag and etag.endswith('"') and not etag.startswith("W/"):
+            headers["etag"] = f'{etag[:-1]}-{self.encoding}"'
+
+    async def send_wrapper(self, message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers") or [])
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            status = message["status"]
+            if status == 304:
+                if self.revalidating:
+                    # Confirm the compressed variant the client holds
+                    self._tag_etag(MutableHeaders(raw=message["headers"]))
+                self.passthrough = True
+            elif (status < 200 or status == 204 or "content-encoding" in headers
+                    or content_type.startswith("text/event-stream")
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                self.passthrough = True
+            else:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            with instrumentation.timed("compress"):
+                data = self.compressor.compress(body) if body else b""
+                if not more_body:
+                    data += self.compressor.finish()
+            if data or not more_body:
+                await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if self.buffered < self.minimum_size:
+            if more_body:
+                return
+            # Too small to be worth it; send as it is
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": b"".join(self.buffer), "more_body": False})
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["content-encoding"] = self.encoding
+        self._tag_etag(headers)
+        self.compressor = _Brotli(BROTLI_QUALITY) if self.encoding == "br" else _Gzip(GZIP_LEVEL)
+        with instrumentation.timed("compress"):
+            data = self.compressor.compress(b"".join(self.buffer))
+            if not more_body:
+                data += self.compressor.finish()
+        self.buffer = []
+        if more_body:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(len(data))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
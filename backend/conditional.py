@@ -0,0 +1,51 @@
+"""
+Conditional GET for the listing endpoints.
+
+Listings are polled far more often than the data behind them changes.
+Every write bumps a version counter in shared_state (users, ports) and the
+container registry fingerprints its contents; a listing's ETag is a hash
+of the versions it depends on and the request's query string. A poll
+whose If-None-Match still matches is answered with 304 before any query
+runs or any row is serialized.
+
+With a shared backend every worker computes the same tag, so a client
+bouncing between workers still gets 304s. Writes made outside the API
+(scripts, a lagging read replica) bump nothing and are only picked up
+when the ETag's time bucket rolls over; LISTING_ETAG_TTL bounds that
+staleness.
+"""
+import hashlib
+import json
+import os
+import time
+from fastapi import Request, Response
+
+# Seconds after which an ETag changes even if no counter moved (0 = never)
+LISTING_ETAG_TTL = int(os.getenv("LISTING_ETAG_TTL", "60"))
+
+
+def listing_etag(request: Request, *versions):
+    """Strong ETag for this request's listing at the given data versions (shared_state.versions.snapshot())"""
+    bucket = int(time.time() // LISTING_ETAG_TTL) if LISTING_ETAG_TTL else 0
+    raw = json.dumps([bucket, request.url.path, sorted(request.query_params.multi_items()), versions])
+    return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def not_modified(request: Request, etag: str):
+    """True if If-None-Match matches etag (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cache_headers(etag: str):
+    # no-cache: browsers may keep the body but must revalidate it on every poll
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified_response(etag: str):
+    return Response(status_code=304, headers=cache_headers(etag))
+
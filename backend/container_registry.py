@@ -0,0 +1,334 @@
+"""
+Process-wide registry of chatbot_ container state.
+
+The registry is seeded with one full listing at startup and then kept current
+by a background thread subscribed to the Docker events stream, so request
+handlers read container state from memory instead of asking the daemon.
+When the docker_daemon circuit breaker opens or closes the registry
+resyncs at once, so an outage shows up as docker_available=False without
+waiting for the next poll.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from docker.errors import DockerException
+import circuit_breaker
+import docker_cli
+import docker_client
+import instrumentation
+
+CONTAINER_PREFIX = "chatbot_"
+
+# Full resync interval while the event stream is healthy (seconds)
+RESYNC_INTERVAL = int(os.getenv("CONTAINER_RESYNC_INTERVAL", "300"))
+# Polling interval used while the event stream is down (seconds)
+FALLBACK_POLL_INTERVAL = int(os.getenv("CONTAINER_POLL_INTERVAL", "15"))
+# Snapshots older than this are reported as stale (seconds)
+MAX_STALENESS = int(os.getenv("CONTAINER_MAX_STALENESS", "60"))
+
+CONTAINER_EVENTS = {"create", "start", "restart", "stop", "die", "kill", "pause", "unpause", "rename", "destroy"}
+
+
+def _summary_name(summary):
+    """Primary name of a container from a /containers/json summary"""
+    for name in summary.get("Names") or []:
+        # Legacy link aliases look like /other/alias
+        if name.count("/") == 1:
+            return name.lstrip("/")
+    return ""
+
+
+def _container_info(summary, image_tags):
+    """Build the listing entry from a /containers/json summary.
+
+    image_tags maps image ids to their first repo tag and is only consulted
+    when the summary carries a bare image id (e.g. the tag was moved).
+    """
+    ports_list = []
+    for port in summary.get("Ports") or []:
+        if port.get("PublicPort"):
+            mapping = f"{port['PublicPort']}:{port['PrivatePort']}/{port.get('Type', 'tcp')}"
+            # IPv4 and IPv6 bindings of the same port are reported separately
+            if mapping not in ports_list:
+                ports_list.append(mapping)
+
+    image_name = summary.get("Image") or "nginx:alpine"
+    if image_name.startswith("sha256:"):
+        image_name = image_tags.get(summary.get("ImageID"), image_name)
+
+    created = summary.get("Created")
+    return {
+        "id": summary["Id"][:12],
+        "name": _summary_name(summary),
+        "image": image_name,
+        "status": summary.get("State", "unknown"),
+        "ports": ", ".join(ports_list) if ports_list else "N/A",
+        "created": datetime.utcfromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S") if created else "N/A"
+    }
+
+
+def _diff(old, new):
+    """Entries that differ between two name -> info maps (None where removed)"""
+    return {name: new.get(name) for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+
+class ContainerRegistry:
+    """In-memory view of chatbot_ containers fed by the Docker events API"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._containers = {}
+        self._image_tags = {}
+        self._last_refresh_calls = 0
+        self._docker_available = False
+        # Bumped on every change so readers can cheaply tell if anything moved
+        self._version = 0
+        self._fingerprint = None
+        self._fingerprint_version = None
+        self._listeners = []
+        self._last_sync = None
+        self._stream_connected = False
+        self._stream = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Seed the registry and start the background event subscriber"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="container-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def snapshot(self):
+        """Return (containers by name, docker_available) without touching the daemon"""
+        if self._last_sync is None:
+            # Registry was never seeded (e.g. used outside the API process)
+            self.refresh()
+        with self._lock:
+            return dict(self._containers), self._docker_available
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def fingerprint(self):
+        """Hash of the registry contents; unlike version, the same in every worker seeing the same containers"""
+        with self._lock:
+            if self._fingerprint_version != self._version:
+                raw = json.dumps([self._docker_available, sorted(self._containers.items())], sort_keys=True)
+                self._fingerprint = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+                self._fingerprint_version = self._version
+            return self._fingerprint
+
+    def add_listener(self, callback):
+        """Register callback(changes, docker_available), called after every change.
+
+        changes maps container names to their new entry, or None when the
+        container is gone. Callbacks run on whichever thread made the
+        change and must not block.
+        """
+        self._listeners.append(callback)
+
+    def _changed(self, changes, availability_changed=False):
+        """Bump the version and notify listeners; call without holding the lock"""
+        if not changes and not availability_changed:
+            return
+        for callback in self._listeners:
+            try:
+                callback(changes, self._docker_available)
+            except Exception as e:
+                print(f"Container registry listener failed: {e}")
+
+    def counts(self):
+        """Return (running, total, docker_available) without copying the registry"""
+        if self._last_sync is None:
+            self.refresh()
+        with self._lock:
+            running = sum(1 for info in self._containers.values() if info["status"] == "running")
+            return running, len(self._containers), self._docker_available
+
+    def status(self):
+        with self._lock:
+            age = time.time() - self._last_sync if self._last_sync else None
+            return {
+                "containers": len(self._containers),
+                "docker_available": self._docker_available,
+                "event_stream_connected": self._stream_connected,
+                "last_sync_age": round(age, 1) if age is not None else None,
+                "last_refresh_daemon_calls": self._last_refresh_calls,
+                "stale": age is None or (not self._stream_connected and age > MAX_STALENESS)
+            }
+
+    def refresh(self):
+        """Full resync from the daemon, falling back to the docker CLI.
+
+        Returns the number of daemon API calls made: one listing call, plus
+        one image listing only if some container reports a bare image id.
+        """
+        containers = None
+        daemon_calls = 0
+        try:
+            with circuit_breaker.docker_daemon.guard(circuit_breaker.daemon_failure), instrumentation.timed("docker"):
+                client = docker_client.provider.client
+                daemon_calls += 1
+                summaries = [s for s in client.api.containers(all=True, filters={"name": CONTAINER_PREFIX})
+                             if _summary_name(s).startswith(CONTAINER_PREFIX)]
+                if any((s.get("Image") or "").startswith("sha256:") for s in summaries):
+                    daemon_calls += 1
+                    self._image_tags = {image["Id"]: image["RepoTags"][0]
+                                        for image in client.api.images() if image.get("RepoTags")}
+            containers = {}
+            for summary in summaries:
+                info = _container_info(summary, self._image_tags)
+                containers[info["name"]] = info
+        except DockerException as e:
+            print(f"Docker API failed: {e}")
+            with instrumentation.timed("docker"):
+                containers = docker_cli.driver.list_containers(CONTAINER_PREFIX)
+
+        changes = {}
+        with self._lock:
+            availability_changed = self._docker_available != (containers is not None)
+            if containers is None:
+                self._docker_available = False
+            else:
+                changes = _diff(self._containers, containers)
+                self._containers = containers
+                self._docker_available = True
+            if changes or availability_changed:
+                self._version += 1
+            self._last_sync = time.time()
+            self._last_refresh_calls = daemon_calls
+        self._changed(changes, availability_changed)
+        return daemon_calls
+
+    def refresh_container(self, name_or_id):
+        """Re-read a single container, e.g. right after an action on it"""
+        try:
+            with circuit_breaker.docker_daemon.guard(circuit_breaker.daemon_failure), instrumentation.timed("docker"):
+                client = docker_client.provider.client
+                if name_or_id.startswith(CONTAINER_PREFIX):
+                    # The name filter is a substring match: chatbot_1 also finds chatbot_10
+                    summaries = [s for s in client.api.containers(all=True, filters={"name": name_or_id})
+                                 if _summary_name(s) == name_or_id]
+                else:
+                    summaries = client.api.containers(all=True, filters={"id": name_or_id})
+        except DockerException as e:
+            print(f"Docker API failed for container refresh: {e}")
+            return
+
+        self.apply_summaries(name_or_id, summaries)
+
+    def apply_summaries(self, name_or_id, summaries):
+        """Update one container from /containers/json summaries fetched by the caller"""
+        if not summaries:
+            self._remove(name_or_id)
+            return
+
+        summary = summaries[0]
+        info = _container_info(summary, self._image_tags)
+        with self._lock:
+            # Renames leave the old name behind
+            removed = self._drop(summary["Id"][:12])
+            kept = {}
+            if info["name"].startswith(CONTAINER_PREFIX):
+                self._containers[info["name"]] = info
+                kept[info["name"]] = info
+            changes = _diff(removed, kept)
+            if changes:
+                self._version += 1
+        self._changed(changes)
+
+    def _remove(self, name_or_id):
+        with self._lock:
+            changes = {name: None for name in self._drop(name_or_id)}
+            if changes:
+                self._version += 1
+        self._changed(changes)
+
+    def _drop(self, name_or_id):
+        """Remove a container by name or id; returns the removed entries"""
+        removed = {}
+        if name_or_id in self._containers:
+            removed[name_or_id] = self._containers.pop(name_or_id)
+        for name, info in list(self._containers.items()):
+            if info["id"] == name_or_id[:12]:
+                removed[name] = self._containers.pop(name)
+        return removed
+
+    def _breaker_changed(self, state):
+        # May be called on the event loop; only once started, scripts refresh on demand
+        if self._thread is not None:
+            threading.Thread(target=self._resync, name="container-registry-resync", daemon=True).start()
+
+    def _resync(self):
+        # A CLI listing cached from before the change would hide it
+        docker_cli.driver.invalidate()
+        self.refresh()
+
+    def _apply_event(self, event):
+        if event.get("Type") != "container" or event.get("Action") not in CONTAINER_EVENTS:
+            return
+        actor = event.get("Actor", {})
+        name = actor.get("Attributes", {}).get("name", "")
+        container_id = actor.get("ID") or event.get("id", "")
+        if event["Action"] == "destroy":
+            self._remove(container_id)
+            return
+        if name.startswith(CONTAINER_PREFIX) or event["Action"] == "rename":
+            self.refresh_container(container_id)
+
+    def _run(self):
+        poll_interval = FALLBACK_POLL_INTERVAL
+        while not self._stop_event.is_set():
+            # Subscribe from before the resync so nothing falls in between
+            since = int(time.time())
+            self.refresh()
+            try:
+                client = docker_client.provider.client
+                self._stream = client.events(
+                    since=since,
+                    until=since + RESYNC_INTERVAL,
+                    decode=True,
+                    filters={"type": "container"}
+                )
+                self._stream_connected = True
+                poll_interval = FALLBACK_POLL_INTERVAL
+                for event in self._stream:
+                    self._apply_event(event)
+                    if self._stop_event.is_set():
+                        break
+                # Stream ended at `until`: loop round for the periodic resync
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                print(f"Docker event stream unavailable: {e}")
+                self._stream_connected = False
+                # Event stream is down: poll with a full resync until it comes back
+                self._stop_event.wait(poll_interval)
+                poll_interval = min(poll_interval * 2, MAX_STALENESS)
+            finally:
+                self._stream = None
+        self._stream_connected = False
+
+
+registry = ContainerRegistry()
+circuit_breaker.docker_daemon.add_listener(registry._breaker_changed)
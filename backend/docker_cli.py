@@ -0,0 +1,165 @@
+"""
+Docker CLI fallback driver.
+
+Used when the Docker SDK cannot reach the daemon but the `docker` binary
+still works (e.g. a different context or socket configured for the CLI).
+The listing is produced by a single `docker ps -a --format '{{json .}}'`
+call whose output is parsed line by line as it streams in, and the result
+is memoized for a short TTL so concurrent or repeated refreshes share one
+process. Runs go through the docker_cli circuit breaker: while it is open
+no process is spawned and the listing is reported as unavailable. Entries
+have the same shape as the SDK path in container_registry.
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+import circuit_breaker
+
+# How long a CLI listing is reused before spawning docker again (seconds)
+CLI_CACHE_TTL = float(os.getenv("DOCKER_CLI_CACHE_TTL", "10"))
+CLI_TIMEOUT = float(os.getenv("DOCKER_CLI_TIMEOUT", "10"))
+
+# Fallback for CLIs too old to print .State; Status is always English
+_STATUS_STATES = {
+    "up": "running",
+    "exited": "exited",
+    "created": "created",
+    "restarting": "restarting",
+    "removal": "removing",
+    "dead": "dead",
+}
+
+
+def _name(names: str):
+    # Names is comma separated and includes link aliases such as other/alias
+    for name in names.split(","):
+        if "/" not in name:
+            return name
+    return ""
+
+
+def _state(entry: dict):
+    state = entry.get("State")
+    if state:
+        return state.lower()
+    status = entry.get("Status", "")
+    if "(Paused)" in status:
+        return "paused"
+    words = status.split()
+    if words and words[0].lower() == "removal":
+        return "removing"
+    return _STATUS_STATES.get(words[0].lower(), "unknown") if words else "unknown"
+
+
+def _ports(ports: str):
+    """Turn `0.0.0.0:8081->80/tcp, :::8081->80/tcp` into the SDK format `8081:80/tcp`"""
+    mappings = []
+    for binding in ports.split(","):
+        binding = binding.strip()
+        if "->" not in binding:
+            # Exposed but not published
+            continue
+        host, container = binding.split("->", 1)
+        mapping = f"{host.rsplit(':', 1)[-1]}:{container}"
+        if mapping not in mappings:
+            mappings.append(mapping)
+    return ", ".join(mappings) if mappings else "N/A"
+
+
+def _created(created_at: str):
+    # e.g. "2024-05-01 10:20:30 +0200 CEST"; the trailing zone name is informational
+    try:
+        created = datetime.strptime(" ".join(created_at.split()[:3]), "%Y-%m-%d %H:%M:%S %z")
+    except ValueError:
+        return created_at or "N/A"
+    return created.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def container_info(entry: dict):
+    """Build the listing entry from one `docker ps --format '{{json .}}'` line"""
+    return {
+        "id": entry.get("ID", "")[:12],
+        "name": _name(entry.get("Names", "")),
+        "image": entry.get("Image") or "nginx:alpine",
+        "status": _state(entry),
+        "ports": _ports(entry.get("Ports", "")),
+        "created": _created(entry.get("CreatedAt", ""))
+    }
+
+
+class DockerCLI:
+    def __init__(self, ttl: float = CLI_CACHE_TTL, timeout: float = CLI_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.spawned = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def list_containers(self, prefix: str):
+        """Containers whose name starts with prefix, keyed by name; None if the CLI is unusable"""
+        with self._lock:
+            # Held while the CLI runs so concurrent callers wait for one result
+            cached = self._cache.get(prefix)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            containers = self._list(prefix)
+            self._cache[prefix] = (time.monotonic(), containers)
+            return containers
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _list(self, prefix: str):
+        breaker = circuit_breaker.docker_cli
+        try:
+            breaker.allow()
+        except circuit_breaker.CircuitOpen:
+            return None
+        try:
+            process = subprocess.Popen(
+                ["docker", "ps", "-a", "--no-trunc", "--filter", f"name={prefix}", "--format", "{{json .}}"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+        except OSError as e:
+            print(f"Docker CLI unavailable: {e}")
+            breaker.failed(e)
+            return None
+        self.spawned += 1
+        killer = threading.Timer(self.timeout, process.kill)
+        killer.start()
+        containers = {}
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    info = container_info(json.loads(line))
+                except ValueError:
+                    print(f"Unparseable docker ps line: {line[:200]}")
+                    continue
+                # The name filter is a substring match
+                if info["name"].startswith(prefix):
+                    containers[info["name"]] = info
+            stderr = process.stderr.read()
+            returncode = process.wait()
+        finally:
+            killer.cancel()
+            process.stdout.close()
+            process.stderr.close()
+        if returncode != 0:
+            print(f"docker ps failed ({returncode}): {stderr.strip()}")
+            # Killed by the timer or unable to reach the daemon
+            breaker.failed(stderr.strip() or f"exit code {returncode}")
+            return None
+        breaker.succeeded()
+        return containers
+
+
+driver = DockerCLI()
@@ -0,0 +1,121 @@
+"""
+Shared Docker client for the whole process.
+
+One DockerClient (and its connection pool over the Docker socket) is created
+at startup and shared through the module-level `provider`; the container
+registry reads and subscribes through it, while request handlers use the
+async client in async_docker. Daemon health is checked by a background thread, which also
+reconnects with exponential backoff, so the request path never pings.
+Ping results are reported to the docker_daemon circuit breaker.
+"""
+import os
+import threading
+import docker
+from docker.errors import DockerException
+import circuit_breaker
+
+# Connections kept open to the daemon (the events subscriber holds one)
+POOL_SIZE = int(os.getenv("DOCKER_POOL_SIZE", "10"))
+# Per-call timeout for daemon requests (seconds)
+REQUEST_TIMEOUT = int(os.getenv("DOCKER_TIMEOUT", "30"))
+# Interval between background health checks (seconds)
+HEALTH_CHECK_INTERVAL = int(os.getenv("DOCKER_HEALTH_CHECK_INTERVAL", "30"))
+MAX_RECONNECT_BACKOFF = int(os.getenv("DOCKER_MAX_RECONNECT_BACKOFF", "60"))
+
+
+class DockerClientProvider:
+    """Lifecycle-managed DockerClient with background health checks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._healthy = False
+        self._last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def client(self):
+        """The shared client; raises DockerException while the daemon is unreachable"""
+        if self._client is None and self._thread is None:
+            # Not started (e.g. used from a script): connect on first use
+            self._connect()
+        with self._lock:
+            if not self._healthy or self._client is None:
+                raise DockerException(f"Docker daemon unavailable: {self._last_error}")
+            return self._client
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._connect()
+        self._thread = threading.Thread(target=self._run, name="docker-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._close()
+
+    def status(self):
+        return {"healthy": self._healthy, "last_error": self._last_error}
+
+    def _connect(self):
+        try:
+            client = docker.from_env(max_pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT)
+            client.ping()
+        except Exception as e:
+            with self._lock:
+                self._healthy = False
+                self._last_error = str(e)
+            print(f"Docker connection failed: {e}")
+            circuit_breaker.docker_daemon.failed(e)
+            return False
+        with self._lock:
+            self._close()
+            self._client = client
+            self._healthy = True
+            self._last_error = None
+        circuit_breaker.docker_daemon.succeeded()
+        return True
+
+    def _close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def _check(self):
+        client = self._client
+        if client is None:
+            return False
+        try:
+            client.ping()
+        except Exception as e:
+            with self._lock:
+                self._healthy = False
+                self._last_error = str(e)
+            print(f"Docker health check failed: {e}")
+            circuit_breaker.docker_daemon.failed(e)
+            return False
+        circuit_breaker.docker_daemon.succeeded()
+        return True
+
+    def _run(self):
+        backoff = 1
+        while not self._stop_event.wait(HEALTH_CHECK_INTERVAL if self._healthy else backoff):
+            if self._healthy and self._check():
+                continue
+            if self._connect():
+                backoff = 1
+            else:
+                backoff = min(backoff * 2, MAX_RECONNECT_BACKOFF)
+
+
+provider = DockerClientProvider()
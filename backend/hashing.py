@@ -0,0 +1,116 @@
+"""
+Password hashing service backed by a process pool.
+
+bcrypt costs hundreds of milliseconds of CPU per call and holds the GIL,
+so hashing and verification run in worker processes instead of the event
+loop or the request threadpool. The number of in-flight operations is
+capped; once the cap is reached new requests are rejected immediately
+with HashingBusy rather than queueing behind a login burst.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from passlib.context import CryptContext
+import instrumentation
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+# In-flight hash/verify operations allowed before new ones are rejected
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def truncate_password(password: str):
+    # Ensure password is within bcrypt's 72-byte limit
+    if len(password.encode('utf-8')) > 72:
+        password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
+    return password
+
+
+def hash_password(password: str):
+    return pwd_context.hash(truncate_password(password))
+
+
+def verify_password(password: str, hashed: str):
+    return pwd_context.verify(truncate_password(password), hashed)
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashing operations are already in flight"""
+
+
+class HashingService:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._metrics = {op: {"count": 0, "rejected": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                         for op in ("hash", "verify")}
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process already runs background threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, op: str, fn, *args):
+        executor = self._executor or self.start()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._metrics[op]["rejected"] += 1
+                raise HashingBusy(f"{self._pending} password operations already in progress")
+            self._pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self.shutdown()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            instrumentation.add_time("hashing", elapsed)
+            with self._lock:
+                self._pending -= 1
+                metrics = self._metrics[op]
+                metrics["count"] += 1
+                metrics["total_seconds"] += elapsed
+                metrics["max_seconds"] = max(metrics["max_seconds"], elapsed)
+
+    async def hash(self, password: str):
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed: str):
+        return await self._submit("verify", verify_password, password, hashed)
+
+    def metrics(self):
+        with self._lock:
+            result = {"workers": self.workers, "pending": self._pending, "max_pending": self.max_pending}
+            for op, metrics in self._metrics.items():
+                average = metrics["total_seconds"] / metrics["count"] if metrics["count"] else 0.0
+                result[op] = {
+                    "count": metrics["count"],
+                    "rejected": metrics["rejected"],
+                    "avg_ms": round(average * 1000, 1),
+                    "max_ms": round(metrics["max_seconds"] * 1000, 1)
+                }
+            return result
+
+
+service = HashingService()
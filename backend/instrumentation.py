@@ -0,0 +1,203 @@
+"""
+Request instrumentation.
+
+InstrumentationMiddleware times every request by route template (so
+/api/users/42 and /api/users/43 share a series) and gives each request a
+phase accumulator in a context variable. Code that waits on something
+reports the time with `timed(phase)` or `add_time(phase, seconds)`:
+
+    db        executing statements (SQLAlchemy cursor events)
+    db_wait   waiting for a pooled connection
+    docker    Docker Engine API and docker CLI calls
+    hashing   bcrypt in the hashing process pool
+    serialize encoding the JSON response body
+    compress  gzip/brotli compression of the body
+
+Time spent outside those phases is recorded as "other". Phases are summed
+over calls, so a handler that awaits ten Docker calls concurrently can
+report more Docker time than wall time. Calls made outside a request
+(background threads, startup) are not recorded.
+
+render() returns everything in the Prometheus text exposition format.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.responses import JSONResponse
+
+# Upper bounds in seconds; +Inf is implied
+BUCKETS = tuple(float(b) for b in os.getenv(
+    "METRICS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+).split(","))
+PHASES = ("db", "db_wait", "docker", "hashing", "serialize", "compress", "other")
+
+_phases = ContextVar("request_phases", default=None)
+
+
+def add_time(phase: str, seconds: float):
+    """Charge seconds to phase of the current request, if there is one"""
+    phases = _phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(phase, time.perf_counter() - started)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, labels, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # One count per bucket plus +Inf, then sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(snapshot.items()):
+            labels = _format_labels(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = Histogram(
+            "http_request_duration_seconds",
+            "Request latency by route; for event streams, the time until the stream opened",
+            ("method", "route", "status"),
+        )
+        self.phases = Histogram(
+            "http_request_phase_seconds",
+            "Per-request time spent in each phase (" + ", ".join(PHASES) + ")",
+            ("method", "route", "phase"),
+        )
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        # name -> (help, type, callable returning [(labels dict, value)])
+        self._collectors = {}
+
+    def register(self, name: str, help_text: str, collect, kind: str = "gauge"):
+        """Export values computed at scrape time, e.g. pool or queue status"""
+        self._collectors[name] = (help_text, kind, collect)
+
+    def record(self, method, route, status, duration, phases):
+        self.requests.observe((method, route, status), duration)
+        accounted = 0.0
+        for phase, seconds in phases.items():
+            accounted += seconds
+            self.phases.observe((method, route, phase), seconds)
+        self.phases.observe((method, route, "other"), max(0.0, duration - accounted))
+
+    def render(self):
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        lines += self.requests.render()
+        lines += self.phases.render()
+        for name, (help_text, kind, collect) in sorted(self._collectors.items()):
+            try:
+                samples = collect()
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                suffix = f"{{{_format_labels(sorted(labels.items()))}}}" if labels else ""
+                lines.append(f"{name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """Plain ASGI middleware, so streaming responses pass through untouched"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        phases = {}
+        token = _phases.set(phases)
+        response = {"status": "500", "opened": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = str(message["status"])
+                headers = dict(message.get("headers") or [])
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    response["opened"] = time.perf_counter()
+            await send(message)
+
+        with metrics._lock:
+            metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = response["opened"] or time.perf_counter()
+            _phases.reset(token)
+            with metrics._lock:
+                metrics.in_flight -= 1
+            route = scope.get("route")
+            # Unmatched paths (404s, scanners) share one series instead of one each
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics.record(scope["method"], route_path, response["status"], finished - started, phases)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that charges body encoding to the serialize phase"""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+metrics = Metrics()
@@ -0,0 +1,252 @@
+"""
+Live dashboard updates pushed to connected admins.
+
+Every change to a tenant container or user becomes a numbered event. Each
+event is encoded as Server-Sent Events text once and the same string is
+handed to every connected client. Recent events are kept in a bounded
+history so a client that reconnects with the last event id it saw
+receives only what it missed; when that is no longer possible (history
+rolled over, client too slow) it gets a `reset` event and reloads the
+full lists once.
+
+Each worker numbers its own events, so event ids are "<epoch>-<seq>"
+with an epoch picked at random per process. An id from another worker,
+or from before a restart, does not match and also gets a `reset`.
+
+Container events come from each worker's own registry. User events
+happen in whichever worker handled the request, so they go through
+`relay`: it appends them to a short-lived log in shared_state, and every
+worker tails the log and publishes the other workers' events to its own
+clients. If an entry is lost, the worker's clients get a `reset`.
+"""
+import asyncio
+import json
+import os
+import secrets
+import threading
+from collections import deque
+from container_registry import registry
+import shared_state
+from streams import SSE_KEEPALIVE_INTERVAL, sse_event
+
+# Events kept for clients resuming with Last-Event-ID / ?since=
+LIVE_HISTORY_SIZE = int(os.getenv("LIVE_HISTORY_SIZE", "1000"))
+# Events buffered per client before it is told to reset
+LIVE_CLIENT_QUEUE_SIZE = int(os.getenv("LIVE_CLIENT_QUEUE_SIZE", "256"))
+# How often each worker reads the other workers' events (seconds)
+LIVE_RELAY_INTERVAL = float(os.getenv("LIVE_RELAY_INTERVAL", "0.5"))
+# How long relayed events stay in shared_state (seconds)
+LIVE_RELAY_TTL = float(os.getenv("LIVE_RELAY_TTL", "60"))
+RELAY_SEQ_KEY = "live:seq"
+
+_RESET = object()
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seq = 0
+
+    def offer(self, seq: int, text: str):
+        if self.queue.full():
+            # Slow client: replace its backlog with a single reset
+            self.reset(seq)
+            return
+        self.queue.put_nowait((seq, text))
+
+    def reset(self, seq: int):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((seq, _RESET))
+
+
+class LiveFeed:
+    def __init__(self, history_size: int = LIVE_HISTORY_SIZE, queue_size: int = LIVE_CLIENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history_size)
+        self.epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def bind(self, loop):
+        """Deliver events on loop; publish() may then be called from any thread"""
+        self._loop = loop
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, event: str, data: dict):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            text = sse_event(json.dumps(data), event=event, event_id=self._event_id(seq))
+            self._history.append((seq, text))
+            # Scheduled under the lock so events reach clients in sequence order
+            if self._loop is not None and self._subscribers:
+                self._loop.call_soon_threadsafe(self._fan_out, seq, text)
+        return seq
+
+    def reset_clients(self):
+        """Tell every client to reload its lists; call on the event loop"""
+        for subscriber in list(self._subscribers):
+            subscriber.reset(self._seq)
+
+    def _event_id(self, seq: int):
+        return f"{self.epoch}-{seq}"
+
+    def _position(self, event_id: str):
+        """Sequence number in an id from this feed, or None if another worker or process issued it"""
+        epoch, _, seq = event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _fan_out(self, seq: int, text: str):
+        for subscriber in list(self._subscribers):
+            subscriber.offer(seq, text)
+
+    def _missed(self, since: int):
+        """Events after since, or None if some of them are no longer in the history"""
+        with self._lock:
+            if since > self._seq:
+                return None
+            if since < self._seq and (not self._history or self._history[0][0] > since + 1):
+                return None
+            return [(seq, text) for seq, text in self._history if seq > since]
+
+    def clients(self):
+        return len(self._subscribers)
+
+    async def subscribe(self, since: str = None, keepalive: int = SSE_KEEPALIVE_INTERVAL):
+        """Yield SSE text for every event after the one with id since.
+
+        Without since the client is assumed to load the lists itself and
+        gets a `ready` event carrying the current sequence number first.
+        """
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            if since is None:
+                subscriber.last_seq = self._seq
+                yield self._marker("ready", subscriber.last_seq)
+            else:
+                position = self._position(since)
+                missed = None if position is None else self._missed(position)
+                if missed is None:
+                    subscriber.last_seq = self._seq
+                    yield self._marker("reset", subscriber.last_seq)
+                else:
+                    subscriber.last_seq = position
+                    for seq, text in missed:
+                        subscriber.last_seq = seq
+                        yield text
+            while True:
+                try:
+                    seq, text = await asyncio.wait_for(subscriber.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if text is _RESET:
+                    subscriber.last_seq = seq
+                    yield self._marker("reset", seq)
+                elif seq > subscriber.last_seq:
+                    # Events replayed from the history may also be queued
+                    subscriber.last_seq = seq
+                    yield text
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _marker(self, event: str, seq: int):
+        return sse_event(json.dumps({"seq": seq}), event=event, event_id=self._event_id(seq))
+
+
+class EventRelay:
+    """Shares events between the workers through a log in shared_state"""
+
+    def __init__(self, feed: LiveFeed, interval: float = LIVE_RELAY_INTERVAL, ttl: float = LIVE_RELAY_TTL):
+        self.feed = feed
+        self.interval = interval
+        self.ttl = ttl
+        self._task = None
+        self._next = None
+        # The entry at _next was missing on the last poll (its writer may be mid-append)
+        self._waited = False
+
+    @staticmethod
+    def enabled():
+        # A single worker has nobody to share with
+        return shared_state.backend.kind != shared_state.MemoryBackend.kind
+
+    async def publish(self, event: str, data: dict):
+        """Publish to this worker's clients and, through the log, to every other worker's"""
+        self.feed.publish(event, data)
+        if self.enabled():
+            await shared_state.call(self._append, json.dumps([self.feed.epoch, event, data]))
+
+    def _append(self, entry: str):
+        seq = shared_state.backend.incr(RELAY_SEQ_KEY)
+        shared_state.backend.set(f"live:event:{seq}", entry, self.ttl)
+
+    def start(self):
+        if self._task is None and self.enabled():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        self._next = int(await shared_state.call(shared_state.backend.get, RELAY_SEQ_KEY) or 0) + 1
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"Live event relay failed: {e}")
+
+    async def poll(self):
+        """Publish the other workers' events logged since the last poll"""
+        last = int(await shared_state.call(shared_state.backend.get, RELAY_SEQ_KEY) or 0)
+        if last < self._next - 1:
+            # The log started over (e.g. a flushed Redis)
+            self._next = last + 1
+            self.feed.reset_clients()
+            return
+        if last < self._next:
+            return
+        seqs = list(range(self._next, last + 1))
+        entries = await shared_state.call(shared_state.backend.get_many, [f"live:event:{seq}" for seq in seqs])
+        for seq, entry in zip(seqs, entries):
+            if entry is None:
+                if not self._waited:
+                    self._waited = True
+                    self._next = seq
+                    return
+                # Expired, or its writer died between numbering and writing it
+                self.feed.reset_clients()
+            else:
+                epoch, event, data = json.loads(entry)
+                if epoch != self.feed.epoch:
+                    self.feed.publish(event, data)
+            self._waited = False
+        self._next = last + 1
+
+
+def _container_changes(changes, docker_available):
+    for name, info in changes.items():
+        feed.publish("container", {"name": name, "container": info, "docker_available": docker_available})
+    if not changes:
+        feed.publish("docker", {"docker_available": docker_available})
+
+
+feed = LiveFeed()
+relay = EventRelay(feed)
+registry.add_listener(_container_changes)
@@ -1,15 +1,83 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import math
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-import subprocess
+from starlette.concurrency import run_in_threadpool
+import circuit_breaker
 import database
 import models
-import docker
-from docker.errors import DockerException
-from routers import registration, users, containers, auth, admin_management, profile
+from container_registry import registry
+import docker_client
+import async_docker
+import provisioning
+import stats
+import hashing
+import schema
+import live_updates
+import streams
+import port_allocator
+import resource_metrics
+import shared_state
+import instrumentation
+import compression
+from routers import registration, users, containers, auth, admin_management, profile, live, resources, diagnostics
 
-app = FastAPI(title="Admin Dashboard API", version="2.0.0")
+# How long a worker waits for another one to finish the startup tasks (seconds)
+STARTUP_LOCK_TIMEOUT = int(os.getenv("STARTUP_LOCK_TIMEOUT", "300"))
+
+# Elected among the workers to run singleton duties
+leader = shared_state.Leader("api")
+
+def run_startup_tasks():
+    """Migrations and default admin, one worker at a time.
+
+    The tasks are idempotent, so the workers after the first find nothing
+    left to do; the lock only keeps them from migrating concurrently.
+    """
+    with shared_state.lock("startup", ttl=STARTUP_LOCK_TIMEOUT, wait=STARTUP_LOCK_TIMEOUT):
+        startup_event()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(run_startup_tasks)
+    live_updates.feed.bind(asyncio.get_running_loop())
+    # Brings user events from the other workers
+    live_updates.relay.start()
+    await run_in_threadpool(docker_client.provider.start)
+    await run_in_threadpool(registry.start)
+    try:
+        await run_in_threadpool(port_allocator.allocator.load)
+    except Exception as e:
+        # Loaded again on first use
+        print(f"Port allocations not loaded: {e}")
+    # The leader also re-queues jobs that went stale while it leads
+    await provisioning.queue.start(leader)
+    hashing.service.start()
+    # The leader re-queues provisioning jobs whose worker died
+    leadership = asyncio.create_task(leader.maintain(on_elected=provisioning.queue.recover))
+    # Only the leader samples the fleet; the other workers copy its samples
+    resource_metrics.collector.start(leader)
+
+    yield
+
+    leadership.cancel()
+    await asyncio.gather(leadership, return_exceptions=True)
+    await run_in_threadpool(leader.resign)
+    await resource_metrics.collector.stop()
+    await live_updates.relay.stop()
+    await provisioning.queue.stop()
+    hashing.service.shutdown()
+    await async_docker.close_async_docker()
+    registry.stop()
+    docker_client.provider.stop()
+    await database.dispose_async_engines()
+
+app = FastAPI(title="Admin Dashboard API", version="2.0.0", default_response_class=instrumentation.TimedJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +92,9 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+app.add_middleware(compression.CompressionMiddleware)
+# Outermost, so the timings include CORS handling and compression
+app.add_middleware(instrumentation.InstrumentationMiddleware)
 
 # Include routers
 app.include_router(registration.router)
@@ -31,9 +102,20 @@ app.include_router(users.router)
 app.include_router(containers.router)
 app.include_router(admin_management.router)
 app.include_router(profile.router)
+app.include_router(live.router)
+app.include_router(resources.router)
+app.include_router(diagnostics.router)
+
+@app.exception_handler(hashing.HashingBusy)
+def hashing_busy_handler(request: Request, exc: hashing.HashingBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server is busy, please retry"}, headers={"Retry-After": "1"})
+
+@app.exception_handler(circuit_breaker.CircuitOpen)
+def circuit_open_handler(request: Request, exc: circuit_breaker.CircuitOpen):
+    return JSONResponse(status_code=503, content={"detail": f"Docker is unavailable: {exc}"}, headers={"Retry-After": str(math.ceil(exc.retry_after))})
 
 @app.post("/api/admin/login")
-def admin_login(credentials: dict, db: Session = Depends(database.get_db)):
+async def admin_login(credentials: dict, db: AsyncSession = Depends(database.get_async_db)):
     try:
         username = credentials.get("username")
         password = credentials.get("password")
@@ -45,89 +127,33 @@ def admin_login(credentials: dict, db: Session = Depends(database.get_db)):
         if len(password.encode('utf-8')) > 72:
             print(f"Password too long ({len(password.encode('utf-8'))} bytes), truncating to 72 bytes")
         
-        if not auth.verify_admin_credentials(username, password, db):
+        admin = await auth.verify_admin_credentials(username, password, db)
+        if not admin:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        token = auth.create_admin_token(username)
+        await auth.admin_cache.put(admin.username, admin.id)
+        token = auth.create_admin_token(admin.username, admin.id)
         return {"token": token}
-    except HTTPException:
+    except (HTTPException, hashing.HashingBusy):
         raise
     except Exception as e:
         print(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed due to server error")
 
 @app.get("/api/admin/stats")
-def get_dashboard_stats(admin: str = Depends(auth.verify_admin_token), db: Session = Depends(database.get_db)):
+async def get_dashboard_stats(request: Request, response: Response, admin: str = Depends(auth.verify_admin_token), db: AsyncSession = Depends(database.get_async_read_db)):
     """Get dashboard statistics"""
-    total_users = db.query(models.User).count()
-    running_containers = 0
-    total_containers = 0
-    docker_available = True
-    
-    try:
-        # Try Docker API first
-        client = docker.from_env()
-        all_containers = client.containers.list(all=True)
-        chatbot_containers = [c for c in all_containers if c.name.startswith('chatbot_')]
-        
-        running_containers = len([c for c in chatbot_containers if c.status == 'running'])
-        total_containers = len(chatbot_containers)
-        
-    except DockerException:
-        # Fallback to subprocess
-        try:
-            # Check if docker is available
-            check_result = subprocess.run(
-                ["docker", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if check_result.returncode == 0:
-                # Get running containers
-                result = subprocess.run(
-                    ["docker", "ps", "--format", "{{.Names}}"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0 and result.stdout.strip():
-                    running_containers = len([line for line in result.stdout.strip().split('\n') 
-                                            if line.strip() and line.startswith('chatbot_')])
-                
-                # Get all containers
-                result_all = subprocess.run(
-                    ["docker", "ps", "-a", "--format", "{{.Names}}"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result_all.returncode == 0 and result_all.stdout.strip():
-                    total_containers = len([line for line in result_all.stdout.strip().split('\n') 
-                                          if line.strip() and line.startswith('chatbot_')])
-            else:
-                docker_available = False
-            
-        except Exception:
-            docker_available = False
-    
-    # If Docker is not available, show expected containers based on users
-    if not docker_available:
-        total_containers = total_users  # Each user should have a container
-        running_containers = 0  # Can't determine without Docker
-    
-    return {
-        "total_users": total_users,
-        "running_containers": running_containers,
-        "total_containers": total_containers,
-        "stopped_containers": max(0, total_containers - running_containers),
-        "docker_available": docker_available
-    }
+    data = await stats.service.get(db)
+    etag = stats.etag_for(data)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={stats.STATS_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return data
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "Admin Dashboard API is running"}
+    return {"status": "healthy", "message": "Admin Dashboard API is running", "docker": docker_client.provider.status(), "circuit_breakers": circuit_breaker.status(), "containers": registry.status(), "hashing": hashing.service.metrics(), "live_clients": live_updates.feed.clients(), "streams": streams.hub.active(), "database": database.pool_status(), "ports": port_allocator.allocator.status(), "worker": {"pid": os.getpid(), "shared_state": shared_state.backend.kind, "leader": leader.status()}}
 
 @app.get("/api/cors-test")
 def cors_test():
@@ -137,8 +163,8 @@ def startup_event():
     try:
         # Test database connection first
         if database.test_database_connection():
-            models.Base.metadata.create_all(bind=database.engine)
-            print("Database tables created/verified")
+            schema.upgrade()
+            print("Database schema is up to date")
             
             # Create default admin if not exists and migrate passwords
             db = next(database.get_db())
@@ -165,7 +191,5 @@ if __name__ == "__main__":
     print("Check database for admin credentials")
     print("="*50)
     
-    # Initialize database on startup
-    startup_event()
-    
-    uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
+    # Startup tasks run in the app's lifespan, in every worker
+    uvicorn.run("main:app", host="0.0.0.0", port=8004, workers=int(os.getenv("WEB_CONCURRENCY", "1")))
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Baseline schema
+
+Databases created before migrations were introduced already have some or
+all of these tables (made by Base.metadata.create_all), so each table is
+only created when it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table):
+    return not sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade():
+    if _missing("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("email", sa.String(100), nullable=False, unique=True),
+            sa.Column("phone", sa.String(20), nullable=False),
+            sa.Column("username", sa.String(50), nullable=False, unique=True),
+            sa.Column("password", sa.String(255), nullable=False),
+            sa.Column("company_name", sa.String(100), nullable=False),
+            sa.Column("subdomain", sa.String(50), nullable=False, unique=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+
+    if _missing("adminList"):
+        op.create_table(
+            "adminList",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(50), nullable=False, unique=True),
+            sa.Column("password", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_adminList_id", "adminList", ["id"])
+
+    if _missing("provisioning_jobs"):
+        op.create_table(
+            "provisioning_jobs",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("error", sa.String(1000)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_provisioning_jobs_user_id", "provisioning_jobs", ["user_id"])
+        op.create_index("ix_provisioning_jobs_status", "provisioning_jobs", ["status"])
+
+
+def downgrade():
+    op.drop_table("provisioning_jobs")
+    op.drop_table("adminList")
+    op.drop_table("users")
@@ -0,0 +1,31 @@
+"""Indexes for the columns tenant listings sort and filter on
+
+Keyset pagination orders by (column, id), so each sortable column gets a
+composite index with id; company_name filters use the same index.
+subdomain is already covered by its unique index, which also serves
+prefix (LIKE 'abc%') lookups.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+    op.create_index("ix_users_name_id", "users", ["name", "id"])
+    op.create_index("ix_users_company_name_id", "users", ["company_name", "id"])
+    op.create_index("ix_provisioning_jobs_status_created_at", "provisioning_jobs", ["status", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_provisioning_jobs_status_created_at", table_name="provisioning_jobs")
+    op.drop_index("ix_users_company_name_id", table_name="users")
+    op.drop_index("ix_users_name_id", table_name="users")
+    op.drop_index("ix_users_created_at_id", table_name="users")
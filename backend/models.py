@@ -1,8 +1,24 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Index, func
+from sqlalchemy.dialects import sqlite
 from database import Base
 
+# SQLite (DATABASE_TEST_MODE) stores CURRENT_TIMESTAMP without microseconds;
+# bind datetimes in the same text format so comparisons against stored
+# values, such as keyset cursors, hold
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
+
 class User(Base):
     __tablename__ = "users"
+    # Listings paginate on (sort column, id); see migrations/versions/0002
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_name_id", "name", "id"),
+        Index("ix_users_company_name_id", "company_name", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=False)
@@ -11,11 +27,33 @@ class User(Base):
     password = Column(String(255), nullable=False)
     company_name = Column(String(100), nullable=False)
     subdomain = Column(String(50), unique=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+
 
 class Admin(Base):
     __tablename__ = "adminList"
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(Timestamp, server_default=func.now())
+
+
+class ProvisioningJob(Base):
+    __tablename__ = "provisioning_jobs"
+    __table_args__ = (
+        Index("ix_provisioning_jobs_status_created_at", "status", "created_at"),
+    )
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    status = Column(String(20), nullable=False, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String(1000))
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+
+class PortAllocation(Base):
+    __tablename__ = "port_allocations"
+    port = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False, unique=True)
+    created_at = Column(Timestamp, server_default=func.now())
@@ -0,0 +1,88 @@
+"""
+Keyset (cursor) pagination shared by the listing endpoints.
+
+A cursor encodes the sort value and id of the last row on a page; the next
+page starts strictly after that pair, so deep pages cost the same as the
+first one and no OFFSET scan is needed.
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def escape_like(value: str):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _keyset(query, sort_column, id_column, descending: bool, cursor: str, limit: int):
+    """Filter and order query (an ORM Query or a select()) to the page after cursor"""
+    if limit < 1 or limit > MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIMIT}")
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is not None and sort_column.type.python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        if descending:
+            query = query.filter(or_(sort_column < sort_value,
+                                     and_(sort_column == sort_value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_column > sort_value,
+                                     and_(sort_column == sort_value, id_column > last_id)))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Fetch one extra row to know whether another page exists
+    return query.limit(limit + 1)
+
+
+def _page(rows, sort_column, id_column, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def paginate(query, sort_column, id_column, descending: bool, cursor: str, limit: int):
+    """Apply keyset ordering to query and return (rows, total, next_cursor).
+
+    The query must select sort_column and id_column (under their own names).
+    total counts every row matching the query's filters, not just this page.
+    """
+    page_query = _keyset(query, sort_column, id_column, descending, cursor, limit)
+    total = query.order_by(None).count()
+    rows, next_cursor = _page(page_query.all(), sort_column, id_column, limit)
+    return rows, total, next_cursor
+
+
+async def paginate_async(db, statement, sort_column, id_column, descending: bool, cursor: str, limit: int):
+    """paginate() for a select() statement run on an AsyncSession"""
+    page_statement = _keyset(statement, sort_column, id_column, descending, cursor, limit)
+    total = await db.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+    rows, next_cursor = _page((await db.execute(page_statement)).all(), sort_column, id_column, limit)
+    return rows, total, next_cursor
@@ -0,0 +1,184 @@
+"""
+Host port allocation for tenant containers.
+
+Ports are handed out from a configured range and recorded in the
+port_allocations table, which survives restarts. In memory the allocator
+keeps a bitmap of used ports, a FIFO free-list and a user -> port map, so
+allocating, releasing and looking up a port are O(1) and nobody has to
+scan containers to find out which ports are taken. Released ports go to
+the back of the free-list, so a port is not reused immediately.
+
+Every change bumps the shared "ports" version (see shared_state), and
+sync() reloads the index when another worker has bumped it since.
+"""
+import os
+import threading
+from collections import deque
+from sqlalchemy.exc import IntegrityError
+import database
+import models
+import shared_state
+
+PORT_RANGE_START = int(os.getenv("TENANT_PORT_RANGE_START", "20000"))
+PORT_RANGE_END = int(os.getenv("TENANT_PORT_RANGE_END", "29999"))
+
+
+class PortsExhausted(Exception):
+    """Raised when every port in the range is allocated"""
+
+
+class PortAllocator:
+    def __init__(self, start: int = PORT_RANGE_START, end: int = PORT_RANGE_END, session_factory=None):
+        self.start = start
+        self.end = end
+        self._session_factory = session_factory or database.SessionLocal
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Shared "ports" version the index reflects
+        self._synced_version = None
+        self._used = bytearray(end - start + 1)
+        self._free = deque()
+        self._by_user = {}
+
+    def _in_range(self, port: int):
+        return self.start <= port <= self.end
+
+    def load(self):
+        """(Re)build the in-memory index from the table"""
+        # Read first: a change landing during the load makes the next sync reload again
+        version = shared_state.versions.get("ports")
+        db = self._session_factory()
+        try:
+            rows = db.query(models.PortAllocation.port, models.PortAllocation.user_id).all()
+        finally:
+            db.close()
+        with self._lock:
+            self._used = bytearray(self.end - self.start + 1)
+            self._by_user = {}
+            for port, user_id in rows:
+                self._by_user[user_id] = port
+                if self._in_range(port):
+                    self._used[port - self.start] = 1
+            self._free = deque(port for port in range(self.start, self.end + 1) if not self._used[port - self.start])
+            self._loaded = True
+            self._synced_version = version
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def sync(self):
+        """Reload if allocations changed in another worker since the last load"""
+        if not self._loaded or shared_state.versions.get("ports") != self._synced_version:
+            self.load()
+
+    def _changed(self):
+        version = shared_state.versions.bump("ports")
+        with self._lock:
+            # Still in step unless another worker bumped in between
+            if self._synced_version is not None and version == self._synced_version + 1:
+                self._synced_version = version
+
+    def port_for(self, user_id: int):
+        """Allocated port of user_id, or None; never touches the database once loaded"""
+        self._ensure_loaded()
+        return self._by_user.get(user_id)
+
+    def allocate(self, user_id: int):
+        """Return user_id's port, allocating and recording one if it has none"""
+        self._ensure_loaded()
+        reloaded = False
+        while True:
+            with self._lock:
+                port = self._by_user.get(user_id)
+                if port is not None:
+                    return port
+                while self._free and self._used[self._free[0] - self.start]:
+                    self._free.popleft()
+                port = self._free.popleft() if self._free else None
+                if port is not None:
+                    self._used[port - self.start] = 1
+                    self._by_user[user_id] = port
+            if port is None:
+                if reloaded:
+                    raise PortsExhausted(f"No free ports left in {self.start}-{self.end}")
+                # Another process may have released ports since we loaded
+                self.load()
+                reloaded = True
+                continue
+
+            db = self._session_factory()
+            try:
+                db.add(models.PortAllocation(port=port, user_id=user_id))
+                db.commit()
+            except IntegrityError:
+                # Another process took the port or already gave this user one
+                db.rollback()
+                self.load()
+            except Exception:
+                # Not recorded, so not allocated: hand the port back
+                self._unreserve(user_id, port)
+                raise
+            else:
+                self._changed()
+                return port
+            finally:
+                db.close()
+
+    def _unreserve(self, user_id: int, port: int):
+        with self._lock:
+            if self._by_user.get(user_id) == port:
+                del self._by_user[user_id]
+                self._used[port - self.start] = 0
+                self._free.appendleft(port)
+
+    def release(self, user_id: int):
+        """Free user_id's port; returns the port or None if it had none"""
+        return self.release_many([user_id]).get(user_id)
+
+    def release_many(self, user_ids):
+        """Free the ports of several users in one statement; returns {user_id: port} for those that had one"""
+        self._ensure_loaded()
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        db = self._session_factory()
+        try:
+            deleted = db.query(models.PortAllocation).filter(
+                models.PortAllocation.user_id.in_(user_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        released = {}
+        with self._lock:
+            for user_id in user_ids:
+                port = self._by_user.pop(user_id, None)
+                if port is None:
+                    continue
+                released[user_id] = port
+                if self._in_range(port) and self._used[port - self.start]:
+                    self._used[port - self.start] = 0
+                    self._free.append(port)
+        if deleted:
+            self._changed()
+        return released
+
+    def status(self):
+        with self._lock:
+            allocated = len(self._by_user)
+            return {
+                "range": f"{self.start}-{self.end}",
+                "allocated": allocated,
+                "free": len(self._free),
+                "loaded": self._loaded
+            }
+
+
+def user_id_for(container_name: str):
+    """User id encoded in a chatbot_<id> container name, or None"""
+    suffix = container_name[len("chatbot_"):] if container_name.startswith("chatbot_") else ""
+    return int(suffix) if suffix.isdigit() else None
+
+
+allocator = PortAllocator()
@@ -0,0 +1,134 @@
+"""
+Sampling profiler for the running API process.
+
+A background thread snapshots every thread's Python stack with
+sys._current_frames() at a fixed interval and counts identical stacks.
+Nothing is installed in the profiled code, so overhead is one stack walk
+per thread per sample and it is safe to run in production for a short
+while. Stacks are rooted at the thread name, so the event loop
+("MainThread"), threadpool workers and background services can be told
+apart.
+
+Threads blocked waiting for work (idle threadpool workers, an event loop
+in select(), lock waits) are dropped unless include_idle is set, so the
+numbers show where CPU time goes. Whether a thread is waiting is guessed
+from the line it is on, so a sample is occasionally misfiled.
+"""
+import linecache
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", "128"))
+
+# A thread blocked in C (lock, queue, select, socket, sleep) still shows the
+# Python line that made the call, so the leaf line tells waiting from working
+_WAITING_CALL = re.compile(
+    r"\.(get|wait|acquire|join|select|poll|accept|recv\w*|communicate)\("
+    r"|sleep\(|run_forever\(|run_until_complete\("
+)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken"""
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame):
+    # f_lineno is None while a frame is between lines, e.g. just created
+    line = linecache.getline(frame.f_code.co_filename, frame.f_lineno or 0)
+    return bool(_WAITING_CALL.search(line))
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.01, include_idle: bool = False):
+        """Sample all threads for `seconds`; blocks the calling thread, so call it from a worker"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(min(seconds, PROFILER_MAX_SECONDS), interval, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, interval, include_idle):
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        idle = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                samples += 1
+                if not include_idle and _is_idle(frame):
+                    idle += 1
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[tuple(reversed(stack))] += 1
+            time.sleep(interval)
+        return Profile(stacks, samples, idle, time.perf_counter() - started, interval)
+
+
+class Profile:
+    def __init__(self, stacks: Counter, samples: int, idle: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.idle = idle
+        self.duration = duration
+        self.interval = interval
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed format: "thread;outer;...;leaf count", one stack per line.
+
+        Loads directly into speedscope or flamegraph.pl.
+        """
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 30):
+        busy = sum(self.stacks.values())
+        self_counts = Counter()
+        total_counts = Counter()
+        threads = Counter()
+        for stack, count in self.stacks.items():
+            threads[stack[0]] += count
+            self_counts[stack[-1]] += count
+            # A recursive function is counted once per stack
+            for label in set(stack[1:]):
+                total_counts[label] += count
+
+        def rows(counter):
+            return [{"function": label, "samples": count, "percent": round(count / busy * 100, 1)}
+                    for label, count in counter.most_common(top)]
+
+        return {
+            "duration_seconds": round(self.duration, 2),
+            "interval_ms": round(self.interval * 1000, 2),
+            "samples": self.samples,
+            "idle_samples": self.idle,
+            "busy_samples": busy,
+            "threads": dict(threads.most_common()),
+            "top_self": rows(self_counts) if busy else [],
+            "top_total": rows(total_counts) if busy else [],
+            "stacks": [{"stack": ";".join(stack), "samples": count} for stack, count in self.stacks.most_common(top)],
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,308 @@
+"""
+Fleet-wide resource metrics.
+
+A background collector samples CPU, memory, network and block I/O of
+every running tenant container at a fixed interval. Samples are stored in
+one preallocated NumPy array of shape (containers, history, fields): each
+sweep writes one column of the ring for the whole fleet, so memory use is
+fixed and no Python object is created per sample. Top-N and per-tenant
+history queries are computed with array operations over that buffer.
+
+With several API workers only the elected leader sweeps the fleet. It
+publishes each sweep's raw counters through shared_state, and the other
+workers record the same samples into their own ring, so load on the
+daemon does not grow with the number of workers.
+"""
+import asyncio
+import json
+import os
+import time
+import warnings
+import numpy as np
+from docker.errors import DockerException
+from async_docker import get_async_docker, stats_counters
+from container_registry import registry
+import shared_state
+
+# Seconds between sweeps over the fleet
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "30"))
+# Sweeps kept per container (METRICS_HISTORY * METRICS_INTERVAL seconds of history)
+METRICS_HISTORY = int(os.getenv("METRICS_HISTORY", "120"))
+# Containers tracked at once; the buffer is allocated for this many up front
+METRICS_MAX_CONTAINERS = int(os.getenv("METRICS_MAX_CONTAINERS", "4096"))
+# Stats requests in flight during a sweep
+METRICS_CONCURRENCY = int(os.getenv("METRICS_CONCURRENCY", "50"))
+METRICS_REQUEST_TIMEOUT = float(os.getenv("METRICS_REQUEST_TIMEOUT", "10"))
+# How often workers that do not sweep look for the leader's latest sweep (seconds)
+METRICS_FOLLOW_INTERVAL = float(os.getenv("METRICS_FOLLOW_INTERVAL", "5"))
+# The leader's latest sweep, shared with the other workers
+SHARED_SWEEP_KEY = "metrics:sweep"
+
+FIELDS = (
+    "cpu_percent",
+    "memory_usage",
+    "memory_percent",
+    "network_rx_rate",
+    "network_tx_rate",
+    "block_read_rate",
+    "block_write_rate",
+)
+
+# Column positions in the counters returned by async_docker.stats_counters
+_CPU, _SYSTEM, _ONLINE, _MEMORY, _LIMIT, _IO = 0, 1, 2, 3, 4, 5
+_COUNTERS = 9
+
+
+class MetricsRing:
+    """Fixed-size time series for a fleet of containers"""
+
+    def __init__(self, capacity: int = METRICS_MAX_CONTAINERS, history: int = METRICS_HISTORY):
+        self.capacity = capacity
+        self.history = history
+        self._values = np.full((capacity, history, len(FIELDS)), np.nan, dtype=np.float32)
+        # Sweep time of each ring position; 0 where nothing has been written yet
+        self._times = np.zeros(history, dtype=np.float64)
+        # Previous cumulative counters per container, for rates and CPU usage
+        self._last = np.full((capacity, _COUNTERS), np.nan, dtype=np.float64)
+        self._last_time = np.zeros(capacity, dtype=np.float64)
+        self._rows = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._pos = -1
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def names(self):
+        return list(self._rows)
+
+    def _row(self, name: str):
+        row = self._rows.get(name)
+        if row is None:
+            if not self._free:
+                return None
+            row = self._free.pop()
+            self._values[row] = np.nan
+            self._last[row] = np.nan
+            self._last_time[row] = 0
+            self._rows[name] = row
+        return row
+
+    def release(self, name: str):
+        row = self._rows.pop(name, None)
+        if row is not None:
+            self._free.append(row)
+
+    def record(self, timestamp: float, samples: dict):
+        """Store one sweep; samples maps container names to stats_counters() tuples.
+
+        Containers missing from samples get no value for this sweep.
+        Returns the names that could not be stored because the buffer is full.
+        """
+        self._pos = (self._pos + 1) % self.history
+        pos = self._pos
+        self._times[pos] = timestamp
+        self._values[:, pos, :] = np.nan
+
+        names, rows, dropped = [], [], []
+        for name in samples:
+            row = self._row(name)
+            if row is None:
+                dropped.append(name)
+            else:
+                names.append(name)
+                rows.append(row)
+        if not rows:
+            return dropped
+
+        rows = np.array(rows, dtype=np.intp)
+        counters = np.array([samples[name] for name in names], dtype=np.float64)
+        last = self._last[rows]
+        elapsed = timestamp - self._last_time[rows]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # NaN previous counters (first sample) and counter resets (restart) give NaN
+            cpu_delta = counters[:, _CPU] - last[:, _CPU]
+            system_delta = counters[:, _SYSTEM] - last[:, _SYSTEM]
+            cpu_percent = np.where((cpu_delta >= 0) & (system_delta > 0),
+                                   cpu_delta / system_delta * counters[:, _ONLINE] * 100.0, np.nan)
+            memory_percent = np.where(counters[:, _LIMIT] > 0,
+                                      counters[:, _MEMORY] / counters[:, _LIMIT] * 100.0, np.nan)
+            io_delta = counters[:, _IO:] - last[:, _IO:]
+            io_rates = np.where(io_delta >= 0, io_delta / elapsed[:, None], np.nan)
+
+        self._values[rows, pos, :] = np.column_stack(
+            (cpu_percent, counters[:, _MEMORY], memory_percent, io_rates)
+        )
+        self._last[rows] = counters
+        self._last_time[rows] = timestamp
+        return dropped
+
+    def _window(self, window: float, now: float = None):
+        """Ring positions written within the last window seconds, oldest first"""
+        now = time.time() if now is None else now
+        positions = np.nonzero((self._times > 0) & (self._times >= now - window))[0]
+        return positions[np.argsort(self._times[positions])]
+
+    def top(self, field: str, count: int = 10, window: float = 300):
+        """Containers with the highest average of field over the window"""
+        column = FIELDS.index(field)
+        positions = self._window(window)
+        if not self._rows or not len(positions):
+            return []
+        names = list(self._rows)
+        rows = np.fromiter((self._rows[name] for name in names), dtype=np.intp, count=len(names))
+        with warnings.catch_warnings():
+            # Containers without samples in the window average to NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            averages = np.nanmean(self._values[rows[:, None], positions[None, :], column], axis=1)
+        valid = np.nonzero(~np.isnan(averages))[0]
+        if len(valid) > count:
+            valid = valid[np.argpartition(averages[valid], -count)[-count:]]
+        valid = valid[np.argsort(averages[valid])[::-1]]
+        return [{"name": names[i], field: round(float(averages[i]), 2)} for i in valid]
+
+    def series(self, name: str, window: float = 3600, points: int = 60):
+        """Samples of one container over the window, averaged down to at most points buckets"""
+        row = self._rows.get(name)
+        positions = self._window(window)
+        if row is None or not len(positions):
+            return {"timestamps": [], **{field: [] for field in FIELDS}}
+        values = self._values[row, positions, :].astype(np.float64)
+        times = self._times[positions]
+        if len(positions) > points:
+            buckets = np.arange(len(positions)) * points // len(positions)
+            present = ~np.isnan(values)
+            sums = np.zeros((points, len(FIELDS)))
+            counts = np.zeros((points, len(FIELDS)))
+            np.add.at(sums, buckets, np.where(present, values, 0.0))
+            np.add.at(counts, buckets, present)
+            with np.errstate(invalid="ignore"):
+                values = sums / counts
+            # A bucket is labelled with the time of its last sample
+            times = times[np.searchsorted(buckets, np.arange(points), side="right") - 1]
+        return {
+            "timestamps": [round(float(t), 3) for t in times],
+            **{field: [None if np.isnan(v) else round(float(v), 2) for v in values[:, i]]
+               for i, field in enumerate(FIELDS)}
+        }
+
+    def nbytes(self):
+        return self._values.nbytes + self._times.nbytes + self._last.nbytes + self._last_time.nbytes
+
+
+class ResourceCollector:
+    def __init__(self, ring: MetricsRing = None, interval: float = METRICS_INTERVAL,
+                 concurrency: int = METRICS_CONCURRENCY):
+        self.ring = ring or MetricsRing()
+        self.interval = interval
+        self.concurrency = concurrency
+        self._task = None
+        self._last_sweep = None
+        self._leader = None
+
+    def start(self, leader=None):
+        """Sweep every interval; given a shared_state.Leader, only while it leads and copy its sweeps otherwise"""
+        if self._task is None:
+            self._leader = leader
+            self._task = asyncio.create_task(self._run())
+
+    def _sweeping(self):
+        return self._leader is None or self._leader.is_leader
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            if self._sweeping():
+                try:
+                    await self.sweep()
+                except Exception as e:
+                    print(f"Resource metrics sweep failed: {e}")
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+            else:
+                try:
+                    await self.follow()
+                except Exception as e:
+                    print(f"Resource metrics not copied from the leader: {e}")
+                await asyncio.sleep(min(self.interval, METRICS_FOLLOW_INTERVAL))
+
+    def _forget_removed(self, containers):
+        for name in self.ring.names():
+            if name not in containers:
+                self.ring.release(name)
+
+    async def sweep(self, docker=None):
+        """Sample every running tenant container once"""
+        containers, docker_available = registry.snapshot()
+        if not docker_available:
+            return
+        self._forget_removed(containers)
+
+        docker = docker or get_async_docker()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = 0
+
+        async def sample(name):
+            nonlocal errors
+            async with semaphore:
+                try:
+                    raw = await asyncio.wait_for(docker.stats_once(name, one_shot=True), METRICS_REQUEST_TIMEOUT)
+                    return name, stats_counters(raw)
+                except (DockerException, asyncio.TimeoutError, ValueError):
+                    errors += 1
+                    return name, None
+
+        started = time.time()
+        running = [name for name, info in containers.items() if info["status"] == "running"]
+        results = await asyncio.gather(*(sample(name) for name in running))
+        samples = {name: counters for name, counters in results if counters is not None}
+        dropped = self.ring.record(started, samples)
+        if dropped:
+            print(f"Resource metrics buffer full, {len(dropped)} containers not recorded")
+        self._last_sweep = {
+            "at": started,
+            "seconds": round(time.time() - started, 3),
+            "containers": len(running),
+            "errors": errors,
+            "dropped": len(dropped)
+        }
+        # A single worker has nobody to share with
+        if self._leader is not None and shared_state.backend.kind != shared_state.MemoryBackend.kind:
+            sweep = json.dumps({"samples": samples, "status": self._last_sweep})
+            await shared_state.call(shared_state.backend.set, SHARED_SWEEP_KEY, sweep, self.interval * 3)
+
+    async def follow(self):
+        """Record the leader's latest sweep if it is newer than the last one recorded here"""
+        raw = await shared_state.call(shared_state.backend.get, SHARED_SWEEP_KEY)
+        if raw is None:
+            return
+        sweep = json.loads(raw)
+        status = sweep["status"]
+        if self._last_sweep is not None and status["at"] <= self._last_sweep["at"]:
+            return
+        containers, _ = registry.snapshot()
+        self._forget_removed(containers)
+        dropped = self.ring.record(status["at"], {name: tuple(counters) for name, counters in sweep["samples"].items()})
+        self._last_sweep = dict(status, dropped=len(dropped))
+
+    def status(self):
+        return {
+            "interval": self.interval,
+            "sweeping": self._sweeping(),
+            "tracked": len(self.ring.names()),
+            "capacity": self.ring.capacity,
+            "history": self.ring.history,
+            "buffer_bytes": self.ring.nbytes(),
+            "last_sweep": self._last_sweep
+        }
+
+
+collector = ResourceCollector()
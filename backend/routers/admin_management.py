@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import database
+import hashing
 import models
-from routers.auth import verify_admin_token, hash_password
+from routers.auth import admin_cache, verify_admin_token
 
 router = APIRouter(prefix="/api/admin-management", tags=["admin-management"])
 
@@ -12,31 +14,35 @@ class AdminCreate(BaseModel):
     password: str
 
 @router.get("/admins")
-def get_admins(admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    admins = db.query(models.Admin).all()
+async def get_admins(admin: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_read_db)):
+    admins = (await db.execute(select(models.Admin.id, models.Admin.username, models.Admin.created_at))).all()
     return [{"id": admin.id, "username": admin.username, "created_at": admin.created_at} for admin in admins]
 
 @router.post("/admins")
-def create_admin(admin_data: AdminCreate, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    existing_admin = db.query(models.Admin).filter(models.Admin.username == admin_data.username).first()
+async def create_admin(admin_data: AdminCreate, admin: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_db)):
+    existing_admin = await db.scalar(select(models.Admin.id).filter(models.Admin.username == admin_data.username))
     if existing_admin:
         raise HTTPException(status_code=400, detail="Username already exists")
-    
-    hashed_password = hash_password(admin_data.password)
+
+    hashed_password = await hashing.service.hash(admin_data.password)
     new_admin = models.Admin(username=admin_data.username, password=hashed_password)
+
     db.add(new_admin)
-    db.commit()
+    await db.commit()
+    await admin_cache.invalidate(admin_data.username)
     return {"message": f"Admin '{admin_data.username}' created successfully"}
 
 @router.delete("/admins/{admin_id}")
-def delete_admin(admin_id: int, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    admin_to_delete = db.query(models.Admin).filter(models.Admin.id == admin_id).first()
+async def delete_admin(admin_id: int, admin: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_db)):
+    admin_to_delete = await db.get(models.Admin, admin_id)
     if not admin_to_delete:
         raise HTTPException(status_code=404, detail="Admin not found")
-    
+
     if admin_to_delete.username == admin:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
-    
-    db.delete(admin_to_delete)
-    db.commit()
-    return {"message": "Admin deleted successfully"}
\ No newline at end of file
+
+    username = admin_to_delete.username
+    await db.delete(admin_to_delete)
+    await db.commit()
+    await admin_cache.invalidate(username)
+    return {"message": "Admin deleted successfully"}
@@ -1,61 +1,144 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import jwt
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 import database
+import hashing
 import models
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import shared_state
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 SECRET_KEY = "admin-dashboard-secret-key-2024"
 
-def verify_admin_credentials(username: str, password: str, db: Session):
-    admin = db.query(models.Admin).filter(models.Admin.username == username).first()
+# How long a verified admin is trusted without re-checking the database (seconds)
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", "300"))
+ADMIN_CACHE_SIZE = int(os.getenv("ADMIN_CACHE_SIZE", "256"))
+
+class AdminPrincipalCache:
+    """TTL + LRU cache of admins known to exist, mapping username to admin id.
+
+    Entries remember the shared "admins" version they were cached at;
+    invalidate() bumps it, so an admin removed through one worker stops
+    being trusted by all of them.
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, username: str):
+        with self._lock:
+            entry = self._entries.get(username)
+        if entry is None:
+            return None
+        admin_id, expires_at, version = entry
+        if expires_at < time.monotonic() or version != await shared_state.call(shared_state.versions.get, "admins"):
+            with self._lock:
+                self._entries.pop(username, None)
+            return None
+        with self._lock:
+            if username in self._entries:
+                self._entries.move_to_end(username)
+        return admin_id
+
+    async def put(self, username: str, admin_id: int):
+        version = await shared_state.call(shared_state.versions.get, "admins")
+        with self._lock:
+            self._entries[username] = (admin_id, time.monotonic() + self.ttl, version)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+        await shared_state.call(shared_state.versions.bump, "admins")
+
+admin_cache = AdminPrincipalCache(ADMIN_CACHE_TTL, ADMIN_CACHE_SIZE)
+
+async def verify_admin_credentials(username: str, password: str, db: AsyncSession):
+    """Return the Admin if the credentials are valid, otherwise False.
+
+    bcrypt runs in the hashing process pool; hashing.HashingBusy propagates
+    to the caller when the pool is saturated.
+    """
+    admin = await db.scalar(select(models.Admin).filter(models.Admin.username == username))
     if not admin:
         return False
     
-    # Ensure password is within bcrypt's 72-byte limit
-    if len(password.encode('utf-8')) > 72:
-        password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
-    
     try:
         # Check if password is already hashed (starts with $2b$ for bcrypt)
         if admin.password.startswith('$2b$'):
-            return pwd_context.verify(password, admin.password)
+            return admin if await hashing.service.verify(password, admin.password) else False
         else:
             # Plain text password - verify and update to hashed
-            if admin.password == password:
-                admin.password = hash_password(password)
-                db.commit()
-                return True
+            if admin.password == hashing.truncate_password(password):
+                admin.password = await hashing.service.hash(password)
+                await db.commit()
+                return admin
             return False
+    except hashing.HashingBusy:
+        raise
     except Exception as e:
         print(f"Password verification error: {e}")
         return False
 
-def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(database.get_db)):
+async def _verify_token(token: str, db: AsyncSession):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         username = payload.get("sub")
-        admin = db.query(models.Admin).filter(models.Admin.username == username).first()
-        if not admin:
+        # Tokens carry the admin id, so a token issued to a deleted and
+        # re-created admin of the same name does not validate
+        token_admin_id = payload.get("aid")
+        cached_admin_id = await admin_cache.get(username)
+        if cached_admin_id is not None and token_admin_id in (None, cached_admin_id):
+            return username
+        
+        admin_id = await db.scalar(select(models.Admin.id).filter(models.Admin.username == username))
+        if admin_id is None or token_admin_id not in (None, admin_id):
             raise HTTPException(status_code=401, detail="Invalid token")
+        await admin_cache.put(username, admin_id)
         return username
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def create_admin_token(username: str):
+# Cache misses read the primary: a lagging replica could still show a deleted admin
+# and put it back in the cache. The session only connects on a miss.
+async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(database.get_async_db)):
+    return await _verify_token(credentials.credentials, db)
+
+async def verify_admin_token_or_query(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Like verify_admin_token, but also accepts ?token= for EventSource clients that cannot set headers"""
+    if credentials:
+        return await _verify_token(credentials.credentials, db)
+    if token:
+        return await _verify_token(token, db)
+    raise HTTPException(status_code=403, detail="Not authenticated")
+
+def create_admin_token(username: str, admin_id: int = None):
     token_data = {"sub": username, "exp": datetime.utcnow() + timedelta(hours=24)}
+    if admin_id is not None:
+        token_data["aid"] = admin_id
     return jwt.encode(token_data, SECRET_KEY, algorithm="HS256")
 
 def hash_password(password: str):
-    # Ensure password is within bcrypt's 72-byte limit
-    if len(password.encode('utf-8')) > 72:
-        password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
-    return pwd_context.hash(password)
+    """Hash in the calling thread; for scripts and startup. Handlers use hashing.service"""
+    return hashing.hash_password(password)
 
 def create_default_admin(db: Session):
     existing_admin = db.query(models.Admin).filter(models.Admin.username == "admin").first()
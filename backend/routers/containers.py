@@ -1,299 +1,410 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import false, true
 from sqlalchemy.orm import Session
-import subprocess
+from pydantic import BaseModel
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import json
-import docker
+import os
+import time
 from docker.errors import DockerException
-import docker.errors
+import docker.errors as docker_errors
+from circuit_breaker import CircuitOpen
+import conditional
 import database
 import models
-from .auth import verify_admin_token
+from container_registry import CONTAINER_PREFIX, registry
+from async_docker import AsyncDockerClient, get_async_docker, run_cli, summarize_stats
+from pagination import DEFAULT_LIMIT, paginate
+import port_allocator
+import shared_state
+import streams
+import tenant_view
+from .auth import verify_admin_token, verify_admin_token_or_query
+from .users import USER_LISTING_COLUMNS, filter_users, sort_column
 
 router = APIRouter(prefix="/api/containers", tags=["containers"])
 
+BULK_ACTIONS = {"start", "stop", "restart", "remove"}
+BULK_DEFAULT_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "10"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "50"))
+
+def _status_filter(docker_containers, docker_available, status):
+    """Filter on User.id matching users whose container has the given status"""
+    if not docker_available:
+        return true() if status == "docker_unavailable" else false()
+    ids = set()
+    for name, info in docker_containers.items():
+        suffix = name[len(CONTAINER_PREFIX):]
+        if suffix.isdigit() and (status == "not_created" or info["status"] == status):
+            ids.add(int(suffix))
+    if status == "not_created":
+        return models.User.id.notin_(ids)
+    return models.User.id.in_(ids)
+
 @router.get("/")
-def get_containers(admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    """Get all containers with associated user information"""
-    docker_containers = {}
-    docker_available = True
+def get_containers(
+    request: Request,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    status: Optional[str] = None,
+    company_name: Optional[str] = None,
+    subdomain_prefix: Optional[str] = None,
+    format: str = Query("objects", pattern="^(objects|columnar)$"),
+    admin: str = Depends(verify_admin_token),
+    db: Session = Depends(database.get_read_db)
+):
+    """Get one page of containers with associated user information.
+
+    format=columnar returns one array per field instead of one object per row.
+    """
+    # Versions are read before the data, so a concurrent change yields a newer tag next time
+    etag = conditional.listing_etag(request, *shared_state.versions.snapshot("users", "ports"), registry.fingerprint)
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+    # Pick up ports another worker allocated
+    port_allocator.allocator.sync()
+    docker_containers, docker_available = registry.snapshot()
     
+    query = filter_users(db.query(*USER_LISTING_COLUMNS), company_name, subdomain_prefix)
+    if status:
+        # Container state lives in the registry, so turn it into an id filter
+        query = query.filter(_status_filter(docker_containers, docker_available, status))
+    users, total, next_cursor = paginate(query, sort_column(sort), models.User.id, order == "desc", cursor, limit)
+    
+    # Rows come pre-encoded; only tenants whose user or container changed are re-serialized
+    rows = tenant_view.view.rows(users, docker_containers, docker_available)
+    return tenant_view.listing_response(rows, {
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "docker_available": docker_available
+    }, columnar=format == "columnar", headers=conditional.cache_headers(etag))
+
+async def _sync_registry(docker: AsyncDockerClient, container_name: str):
+    """Push a container's new state into the registry right after an action on it"""
     try:
-        # Try Docker API first - check if socket is accessible
-        client = docker.from_env()
-        client.ping()  # Test connection
-        containers = client.containers.list(all=True)
-        
-        for container in containers:
-            name = container.name
-            if name.startswith('chatbot_'):
-                ports_info = "N/A"
-                if container.ports:
-                    ports_list = []
-                    for port, bindings in container.ports.items():
-                        if bindings:
-                            for binding in bindings:
-                                ports_list.append(f"{binding['HostPort']}:{port}")
-                    ports_info = ", ".join(ports_list) if ports_list else "N/A"
-                
-                # Get image name properly
-                image_name = "nginx:alpine"
-                if container.image.tags:
-                    image_name = container.image.tags[0]
-                elif hasattr(container.image, 'attrs') and 'RepoTags' in container.image.attrs:
-                    repo_tags = container.image.attrs['RepoTags']
-                    if repo_tags:
-                        image_name = repo_tags[0]
-                
-                docker_containers[name] = {
-                    "id": container.id[:12],
-                    "name": name,
-                    "image": image_name,
-                    "status": container.status,
-                    "ports": ports_info,
-                    "created": container.attrs['Created'][:19].replace('T', ' ') if 'Created' in container.attrs else "N/A"
-                }
-        
+        summaries = await docker.list_containers(filters={"name": container_name})
     except DockerException as e:
-        print(f"Docker API failed: {e}")
-        # Fallback to subprocess if Docker API fails
-        try:
-            # Check if docker command exists
-            result = subprocess.run(
-                ["docker", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode != 0:
-                docker_available = False
-            else:
-                # Get container list using subprocess
-                result = subprocess.run(
-                    ["docker", "ps", "-a", "--format", "table {{.ID}}\t{{.Names}}\t{{.Image}}\t{{.Status}}\t{{.Ports}}\t{{.CreatedAt}}"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                    for line in lines:
-                        if line.strip():
-                            parts = line.split('\t')
-                            if len(parts) >= 6:
-                                container_id, name, image, status, ports, created = parts[:6]
-                                if name.startswith('chatbot_'):
-                                    docker_containers[name] = {
-                                        "id": container_id[:12],
-                                        "name": name,
-                                        "image": image,
-                                        "status": status.split()[0].lower(),  # Get first word and lowercase
-                                        "ports": ports if ports.strip() else "N/A",
-                                        "created": created
-                                    }
-        except Exception as e:
-            print(f"Docker subprocess failed: {e}")
-            docker_available = False
+        print(f"Docker API failed for container refresh: {e}")
+        return
+    registry.apply_summaries(container_name, [s for s in summaries if f"/{container_name}" in (s.get("Names") or [])])
+
+async def _allocate_port(user_id: int):
+    try:
+        return await run_in_threadpool(port_allocator.allocator.allocate, user_id)
+    except port_allocator.PortsExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def _release_port(container_name: str):
+    """Give a removed container's host port back to the pool"""
+    user_id = port_allocator.user_id_for(container_name)
+    if user_id is not None:
+        await run_in_threadpool(port_allocator.allocator.release, user_id)
+
+def _cli_error(result):
+    return result.stderr.strip() or result.stdout.strip() or f"exit code {result.returncode}"
+
+class BulkSelector(BaseModel):
+    # Container state, e.g. "running" or "exited"; "stopped" means anything not running
+    status: Optional[str] = None
+    subdomain_prefix: Optional[str] = None
+
+class BulkContainerAction(BaseModel):
+    action: str
+    names: Optional[List[str]] = None
+    selector: Optional[BulkSelector] = None
+    concurrency: int = BULK_DEFAULT_CONCURRENCY
+    # Per-container budget in seconds, including the graceful stop timeout
+    timeout: float = 60
+    stop_timeout: int = 10
+
+def _select_containers(selector: BulkSelector, db: Session):
+    docker_containers, docker_available = registry.snapshot()
+    if not docker_available:
+        raise HTTPException(status_code=503, detail="Docker is unavailable")
+    names = set(docker_containers)
+    if selector.status == "stopped":
+        names = {name for name in names if docker_containers[name]["status"] != "running"}
+    elif selector.status:
+        names = {name for name in names if docker_containers[name]["status"] == selector.status}
+    if selector.subdomain_prefix:
+        users = filter_users(db.query(models.User.id), None, selector.subdomain_prefix).all()
+        names &= {f"{CONTAINER_PREFIX}{user.id}" for user in users}
+    return sorted(names)
+
+async def _bulk_item(docker: AsyncDockerClient, action: str, name: str, stop_timeout: int):
+    if action == "start":
+        started = await docker.start(name)
+        return "started" if started else "already running"
+    if action == "stop":
+        stopped = await docker.stop(name, timeout=stop_timeout)
+        return "stopped" if stopped else "already stopped"
+    if action == "restart":
+        await docker.restart(name, timeout=stop_timeout)
+        return "restarted"
+    try:
+        await docker.stop(name, timeout=stop_timeout)
+        await docker.remove(name, force=True)
+    except docker_errors.NotFound:
+        await _release_port(name)
+        return "already removed"
+    await _release_port(name)
+    return "removed"
+
+@router.post("/bulk")
+async def bulk_container_action(request: BulkContainerAction, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db), docker: AsyncDockerClient = Depends(get_async_docker)):
+    """Run start/stop/restart/remove over many containers with bounded parallelism"""
+    if request.action not in BULK_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"action must be one of: {', '.join(sorted(BULK_ACTIONS))}")
+    if not 1 <= request.concurrency <= BULK_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {BULK_MAX_CONCURRENCY}")
+    if bool(request.names) == bool(request.selector):
+        raise HTTPException(status_code=400, detail="Provide either names or selector")
     
-    users = db.query(models.User).all()
-    containers_with_users = []
+    if request.names:
+        names = list(dict.fromkeys(request.names))
+        invalid = [name for name in names if not name.startswith(CONTAINER_PREFIX)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid container names: {', '.join(invalid)}")
+    else:
+        names = await run_in_threadpool(_select_containers, request.selector, db)
     
-    for user in users:
-        container_name = f"chatbot_{user.id}"
-        expected_port = f"808{user.id}:80"
-        
-        if docker_available:
-            container_info = docker_containers.get(container_name, {
-                "id": "N/A",
-                "name": container_name,
-                "image": "nginx:alpine",
-                "status": "not_created",
-                "ports": expected_port,
-                "created": "N/A"
-            })
-        else:
-            container_info = {
-                "id": "N/A",
-                "name": container_name,
-                "image": "nginx:alpine",
-                "status": "docker_unavailable",
-                "ports": expected_port,
-                "created": "N/A"
-            }
-        
-        containers_with_users.append({
-            **container_info,
-            "docker_available": docker_available,
-            "user_info": {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "username": user.username,
-                "company_name": user.company_name,
-                "subdomain": user.subdomain,
-                "created_at": user.created_at.isoformat() if user.created_at else None
-            }
-        })
+    semaphore = asyncio.Semaphore(request.concurrency)
+    
+    async def run_one(name):
+        async with semaphore:
+            try:
+                message = await asyncio.wait_for(
+                    _bulk_item(docker, request.action, name, request.stop_timeout),
+                    timeout=request.timeout
+                )
+                return {"name": name, "success": True, "message": message}
+            except docker_errors.NotFound:
+                return {"name": name, "success": False, "message": "not found"}
+            except asyncio.TimeoutError:
+                return {"name": name, "success": False, "message": f"timed out after {request.timeout}s"}
+            except DockerException as e:
+                return {"name": name, "success": False, "message": str(e)}
+    
+    results = await asyncio.gather(*(run_one(name) for name in names))
+    if names:
+        # One resync instead of a per-container refresh
+        await run_in_threadpool(registry.refresh)
     
-    return containers_with_users
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "action": request.action,
+        "requested": len(names),
+        "succeeded": succeeded,
+        "failed": len(names) - succeeded,
+        "results": results
+    }
 
 @router.post("/{container_name}/start")
-def start_container(container_name: str, admin: str = Depends(verify_admin_token)):
+async def start_container(container_name: str, admin: str = Depends(verify_admin_token), docker: AsyncDockerClient = Depends(get_async_docker)):
     """Start a specific container"""
     try:
         # Try Docker API first
-        client = docker.from_env()
-        container = client.containers.get(container_name)
-        if container.status != 'running':
-            container.start()
+        if await docker.start(container_name):
+            await _sync_registry(docker, container_name)
             return {"success": True, "message": f"Container {container_name} started successfully"}
         else:
             return {"success": True, "message": f"Container {container_name} is already running"}
-    except docker.errors.NotFound:
+    except docker_errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_name} not found")
     except DockerException as e:
         print(f"Docker API failed for container start: {e}")
         # Fallback to subprocess
         try:
-            check_result = subprocess.run(
-                ["docker", "ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if container_name not in check_result.stdout:
+            check_result = await run_cli("ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}", timeout=10)
+            if container_name not in check_result.stdout.split():
                 raise HTTPException(status_code=404, detail=f"Container {container_name} not found")
             
-            result = subprocess.run(["docker", "start", container_name], 
-                                  check=True, capture_output=True, text=True, timeout=15)
+            result = await run_cli("start", container_name, timeout=15)
+            if result.returncode != 0:
+                raise HTTPException(status_code=500, detail=f"Failed to start container: {_cli_error(result)}")
+            await run_in_threadpool(registry.refresh)
             return {"success": True, "message": f"Container {container_name} started successfully"}
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode() if e.stderr else str(e)
-            raise HTTPException(status_code=500, detail=f"Failed to start container: {error_msg}")
+        except (OSError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=500, detail=f"Failed to start container: {e!r}")
 
 @router.post("/{container_name}/stop")
-def stop_container(container_name: str, admin: str = Depends(verify_admin_token)):
+async def stop_container(container_name: str, admin: str = Depends(verify_admin_token), docker: AsyncDockerClient = Depends(get_async_docker)):
     """Stop a specific container"""
     try:
         # Try Docker API first
-        client = docker.from_env()
-        container = client.containers.get(container_name)
-        if container.status == 'running':
-            container.stop(timeout=10)
+        if await docker.stop(container_name, timeout=10):
+            await _sync_registry(docker, container_name)
             return {"success": True, "message": f"Container {container_name} stopped successfully"}
         else:
             return {"success": True, "message": f"Container {container_name} is already stopped"}
-    except docker.errors.NotFound:
+    except docker_errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_name} not found")
     except DockerException as e:
         print(f"Docker API failed for container stop: {e}")
         # Fallback to subprocess
         try:
-            result = subprocess.run(["docker", "stop", container_name], 
-                                  check=True, capture_output=True, text=True, timeout=15)
+            result = await run_cli("stop", container_name, timeout=15)
+            if result.returncode != 0:
+                raise HTTPException(status_code=500, detail=f"Failed to stop container: {_cli_error(result)}")
+            await run_in_threadpool(registry.refresh)
             return {"success": True, "message": f"Container {container_name} stopped successfully"}
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode() if e.stderr else str(e)
-            raise HTTPException(status_code=500, detail=f"Failed to stop container: {error_msg}")
+        except (OSError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=500, detail=f"Failed to stop container: {e!r}")
 
 @router.post("/{container_name}/remove")
-def remove_container(container_name: str, admin: str = Depends(verify_admin_token)):
+async def remove_container(container_name: str, admin: str = Depends(verify_admin_token), docker: AsyncDockerClient = Depends(get_async_docker)):
     """Remove a container"""
     try:
         # Try Docker API first
-        client = docker.from_env()
-        container = client.containers.get(container_name)
-        if container.status == 'running':
-            container.stop(timeout=10)
-        container.remove(force=True)
+        await docker.stop(container_name, timeout=10)
+        await docker.remove(container_name, force=True)
+        registry.apply_summaries(container_name, [])
+        await _release_port(container_name)
         return {"success": True, "message": f"Container {container_name} removed successfully"}
-    except docker.errors.NotFound:
+    except docker_errors.NotFound:
+        registry.apply_summaries(container_name, [])
+        await _release_port(container_name)
         return {"success": True, "message": f"Container {container_name} was already removed"}
     except DockerException as e:
         print(f"Docker API failed for container removal: {e}")
         # Fallback to subprocess
         try:
             # Stop first (ignore errors if already stopped)
-            subprocess.run(["docker", "stop", container_name], 
-                         capture_output=True, text=True, timeout=15)
+            await run_cli("stop", container_name, timeout=15)
             # Remove with force
-            result = subprocess.run(["docker", "rm", "-f", container_name], 
-                                  check=True, capture_output=True, text=True, timeout=15)
+            result = await run_cli("rm", "-f", container_name, timeout=15)
+            await run_in_threadpool(registry.refresh)
+            if result.returncode != 0:
+                error_msg = _cli_error(result)
+                # If container doesn't exist, that's actually success
+                if "No such container" in error_msg:
+                    await _release_port(container_name)
+                    return {"success": True, "message": f"Container {container_name} was already removed"}
+                raise HTTPException(status_code=500, detail=f"Failed to remove container: {error_msg}")
+            await _release_port(container_name)
             return {"success": True, "message": f"Container {container_name} removed successfully"}
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode() if e.stderr else str(e)
-            # If container doesn't exist, that's actually success
-            if "No such container" in error_msg:
-                return {"success": True, "message": f"Container {container_name} was already removed"}
-            raise HTTPException(status_code=500, detail=f"Failed to remove container: {error_msg}")
+        except (OSError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=500, detail=f"Failed to remove container: {e!r}")
 
 @router.post("/{container_name}/create")
-def create_container(container_name: str, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
+async def create_container(container_name: str, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db), docker: AsyncDockerClient = Depends(get_async_docker)):
     """Create and start a new container for a user"""
     try:
         if not container_name.startswith("chatbot_"):
             raise HTTPException(status_code=400, detail="Invalid container name format")
         
         user_id = container_name.split("_")[1]
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = await run_in_threadpool(lambda: db.query(models.User.id).filter(models.User.id == user_id).first())
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        port_mapping = f"808{user_id}:80"
-        
         # Try Docker API first
         try:
-            client = docker.from_env()
-            
             # Check if container already exists
             try:
-                existing = client.containers.get(container_name)
-                if existing:
-                    return {"success": False, "message": f"Container {container_name} already exists"}
-            except docker.errors.NotFound:
+                await docker.inspect(container_name)
+                return {"success": False, "message": f"Container {container_name} already exists"}
+            except docker_errors.NotFound:
                 pass  # Container doesn't exist, which is what we want
             
-            container = client.containers.run(
+            port = await _allocate_port(user.id)
+            port_mapping = f"{port}:80"
+            await docker.run(
+                container_name,
                 "nginx:alpine",
-                name=container_name,
-                ports={'80/tcp': f"808{user_id}"},
-                detach=True,
-                restart_policy={"Name": "unless-stopped"}
+                ports={'80/tcp': port},
+                restart_policy="unless-stopped"
             )
+            await _sync_registry(docker, container_name)
             return {"success": True, "message": f"Container {container_name} created successfully with port {port_mapping}"}
             
         except DockerException as e:
             print(f"Docker API failed for container creation: {e}")
             # Fallback to subprocess
+            # Check if container exists first
+            check_result = await run_cli("ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}", timeout=10)
+            if container_name in check_result.stdout.split():
+                return {"success": False, "message": f"Container {container_name} already exists"}
+            
+            port = await _allocate_port(user.id)
+            port_mapping = f"{port}:80"
+            # Create the container
             try:
-                # Check if container exists first
-                check_result = subprocess.run(
-                    ["docker", "ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if container_name in check_result.stdout:
-                    return {"success": False, "message": f"Container {container_name} already exists"}
-                
-                # Create the container
-                result = subprocess.run([
-                    "docker", "run", "-d",
+                result = await run_cli(
+                    "run", "-d",
                     "--name", container_name,
                     "-p", port_mapping,
                     "--restart", "unless-stopped",
-                    "nginx:alpine"
-                ], check=True, capture_output=True, text=True, timeout=30)
-                
-                return {"success": True, "message": f"Container {container_name} created successfully with port {port_mapping}"}
-                
-            except subprocess.CalledProcessError as e:
-                error_msg = e.stderr.decode() if e.stderr else str(e)
-                raise HTTPException(status_code=500, detail=f"Failed to create container via subprocess: {error_msg}")
+                    "nginx:alpine",
+                    timeout=30
+                )
+            except BaseException:
+                # Timed out, no docker binary, open breaker or cancelled
+                await _release_port(container_name)
+                raise
+            if result.returncode != 0:
+                await _release_port(container_name)
+                raise HTTPException(status_code=500, detail=f"Failed to create container via subprocess: {_cli_error(result)}")
+            await run_in_threadpool(registry.refresh)
+            return {"success": True, "message": f"Container {container_name} created successfully with port {port_mapping}"}
         
+    except (HTTPException, CircuitOpen):
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create container: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to create container: {str(e)}")
+
+async def _require_container(docker: AsyncDockerClient, container_name: str):
+    """Fail with a proper status code before a stream response starts"""
+    if not container_name.startswith(CONTAINER_PREFIX):
+        raise HTTPException(status_code=400, detail="Invalid container name format")
+    try:
+        await docker.inspect(container_name)
+    except docker_errors.NotFound:
+        raise HTTPException(status_code=404, detail=f"Container {container_name} not found")
+    except DockerException as e:
+        raise HTTPException(status_code=503, detail=f"Docker is unavailable: {e}")
+
+def _event_stream(body):
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{container_name}/logs")
+async def stream_container_logs(
+    container_name: str,
+    follow: bool = False,
+    tail: str = Query("100", pattern="^(all|[0-9]+)$"),
+    since: Optional[int] = None,
+    admin: str = Depends(verify_admin_token_or_query),
+    docker: AsyncDockerClient = Depends(get_async_docker)
+):
+    """Stream container logs as Server-Sent Events (one event per log chunk)"""
+    await _require_container(docker, container_name)
+    if follow:
+        # Admins following the same container share one upstream of new lines;
+        # each gets its own tail first, up to the moment it joined
+        joined = time.time()
+        source = streams.hub.subscribe(
+            ("logs", container_name),
+            lambda: docker.logs(container_name, follow=True, tail="0"),
+            backlog=lambda: docker.logs(container_name, follow=False, tail=tail, since=since, until=joined)
+        )
+    else:
+        source = docker.logs(container_name, follow=False, tail=tail, since=since)
+    return _event_stream(streams.sse_stream(source, lambda chunk: streams.sse_event(chunk.rstrip("\n"))))
+
+@router.get("/{container_name}/stats/stream")
+async def stream_container_stats(container_name: str, admin: str = Depends(verify_admin_token_or_query), docker: AsyncDockerClient = Depends(get_async_docker)):
+    """Stream live CPU, memory, network and block I/O figures as Server-Sent Events"""
+    await _require_container(docker, container_name)
+    source = streams.hub.subscribe(("stats", container_name), lambda: docker.stats(container_name))
+    return _event_stream(streams.sse_stream(source, lambda raw: streams.sse_event(json.dumps(summarize_stats(raw)))))
@@ -0,0 +1,77 @@
+import os
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+import circuit_breaker
+import database
+import hashing
+import live_updates
+import port_allocator
+import tenant_view
+from container_registry import registry
+from instrumentation import metrics
+from profiler import PROFILER_MAX_SECONDS, ProfilerBusy, profiler
+from .auth import verify_admin_token
+
+router = APIRouter(tags=["diagnostics"])
+
+# Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>" when set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+def _pool_samples(field):
+    return [({"pool": pool}, status[field]) for pool, status in database.pool_status().items()]
+
+metrics.register("db_pool_checked_out", "Connections currently checked out", lambda: _pool_samples("checked_out"))
+metrics.register("db_pool_overflow", "Connections open beyond pool_size", lambda: _pool_samples("overflow"))
+metrics.register("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection",
+                 lambda: _pool_samples("timeouts"), kind="counter")
+metrics.register("hashing_pending", "Password hash/verify operations in flight",
+                 lambda: [({}, hashing.service.metrics()["pending"])])
+metrics.register("live_clients", "Connected live update streams", lambda: [({}, live_updates.feed.clients())])
+metrics.register("docker_available", "1 if the Docker daemon is reachable",
+                 lambda: [({}, int(bool(registry.status()["docker_available"])))])
+metrics.register("docker_circuit_open", "1 while a Docker backend's circuit breaker rejects calls (0 closed, 0.5 half-open)",
+                 lambda: [({"backend": name}, {"closed": 0, "half_open": 0.5, "open": 1}[state["state"]])
+                          for name, state in circuit_breaker.status().items()])
+metrics.register("docker_circuit_rejected_total", "Calls failed fast by a Docker circuit breaker",
+                 lambda: [({"backend": name}, state["rejected_calls"]) for name, state in circuit_breaker.status().items()],
+                 kind="counter")
+metrics.register("tenant_containers", "chatbot_ containers known to the registry",
+                 lambda: [({}, registry.status()["containers"])])
+metrics.register("tenant_view_rows", "Pre-encoded tenant listing rows held in memory",
+                 lambda: [({}, tenant_view.view.status()["rows"])])
+metrics.register("tenant_view_rebuilds_total", "Tenant listing rows re-serialized because an input changed",
+                 lambda: [({}, tenant_view.view.status()["rebuilds"])], kind="counter")
+metrics.register("tenant_ports_allocated", "Host ports allocated to tenants",
+                 lambda: [({}, port_allocator.allocator.status()["allocated"])])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(request: Request):
+    """Request latency histograms and service gauges in Prometheus text format"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not secrets.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.post("/api/admin/diagnostics/profile")
+async def profile_process(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    include_idle: bool = False,
+    top: int = Query(30, ge=1, le=500),
+    admin: str = Depends(verify_admin_token)
+):
+    """Sample every thread's stack for `seconds` and return where the process spent its time.
+
+    format=collapsed returns flame graph input (speedscope, flamegraph.pl).
+    """
+    try:
+        result = await run_in_threadpool(profiler.run, seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result.collapsed())
+    return result.summary(top)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from live_updates import feed
+from .auth import verify_admin_token_or_query
+
+router = APIRouter(prefix="/api/live", tags=["live"])
+
+@router.get("/stream")
+async def live_stream(
+    since: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+    admin: str = Depends(verify_admin_token_or_query)
+):
+    """Server-Sent Events feed of container and user changes.
+
+    Events: `container` (state change, container is null once removed),
+    `user_added`, `user_deleted`, `docker` (daemon availability changed),
+    `ready` (first event when neither since nor Last-Event-ID is given) and
+    `reset` (missed events are gone; reload the lists). since takes an
+    event id; ids from another worker or an earlier run get a `reset`.
+    """
+    if since is None and last_event_id:
+        # Sent automatically by EventSource when it reconnects
+        since = last_event_id
+    return StreamingResponse(
+        feed.subscribe(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import database
 import models
 from routers.auth import verify_admin_token
@@ -7,6 +8,8 @@ from routers.auth import verify_admin_token
 router = APIRouter(prefix="/api/profile", tags=["profile"])
 
 @router.get("/me")
-def get_current_user(admin_username: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    admin = db.query(models.Admin).filter(models.Admin.username == admin_username).first()
-    return {"username": admin.username, "id": admin.id, "created_at": admin.created_at}
\ No newline at end of file
+async def get_current_user(admin_username: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_read_db)):
+    admin = (await db.execute(
+        select(models.Admin.id, models.Admin.username, models.Admin.created_at).filter(models.Admin.username == admin_username)
+    )).first()
+    return {"username": admin.username, "id": admin.id, "created_at": admin.created_at}
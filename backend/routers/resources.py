@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from resource_metrics import FIELDS, collector
+from .auth import verify_admin_token
+
+router = APIRouter(prefix="/api/resources", tags=["resources"])
+
+def _field(metric: str):
+    if metric not in FIELDS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(FIELDS)}")
+    return metric
+
+@router.get("/top")
+async def top_consumers(
+    metric: str = "cpu_percent",
+    limit: int = Query(10, ge=1, le=500),
+    window: int = Query(300, ge=1),
+    admin: str = Depends(verify_admin_token)
+):
+    """Containers with the highest average usage over the last window seconds"""
+    return {
+        "metric": _field(metric),
+        "window": window,
+        "items": collector.ring.top(metric, limit, window)
+    }
+
+@router.get("/status")
+async def collector_status(admin: str = Depends(verify_admin_token)):
+    return collector.status()
+
+@router.get("/{container_name}/history")
+async def container_history(
+    container_name: str,
+    window: int = Query(3600, ge=1),
+    points: int = Query(60, ge=1, le=1000),
+    admin: str = Depends(verify_admin_token)
+):
+    """Resource usage of one container over the last window seconds"""
+    if container_name not in collector.ring:
+        raise HTTPException(status_code=404, detail=f"No metrics recorded for {container_name}")
+    return {
+        "name": container_name,
+        "window": window,
+        "interval": collector.interval,
+        **collector.ring.series(container_name, window, points)
+    }
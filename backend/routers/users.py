@@ -1,16 +1,65 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from docker.errors import DockerException
+import asyncio
+import os
+import docker.errors as docker_errors
+import conditional
 import database
 import models
+from async_docker import AsyncDockerClient, get_async_docker, run_cli
+from container_registry import registry
+import live_updates
+import port_allocator
+import shared_state
+import stats
+import tenant_view
+from pagination import DEFAULT_LIMIT, escape_like, paginate_async
 from .auth import verify_admin_token
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
-@router.get("/")
-def get_users(admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
-    """Get all registered users"""
-    users = db.query(models.User).all()
-    return [{
+BATCH_DELETE_MAX_USERS = int(os.getenv("BATCH_DELETE_MAX_USERS", "1000"))
+BATCH_DELETE_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DELETE_CONCURRENCY", "10"))
+BATCH_DELETE_MAX_CONCURRENCY = int(os.getenv("BATCH_DELETE_MAX_CONCURRENCY", "50"))
+
+# Columns returned by the listings; nothing else is loaded
+USER_LISTING_COLUMNS = (
+    models.User.id,
+    models.User.name,
+    models.User.email,
+    models.User.username,
+    models.User.company_name,
+    models.User.subdomain,
+    models.User.created_at,
+)
+
+USER_SORT_COLUMNS = {
+    "id": models.User.id,
+    "created_at": models.User.created_at,
+    "name": models.User.name,
+    "company_name": models.User.company_name,
+    "subdomain": models.User.subdomain,
+}
+
+def filter_users(query, company_name: Optional[str], subdomain_prefix: Optional[str]):
+    if company_name:
+        query = query.filter(models.User.company_name == company_name)
+    if subdomain_prefix:
+        query = query.filter(models.User.subdomain.like(f"{escape_like(subdomain_prefix)}%", escape="\\"))
+    return query
+
+def sort_column(sort: str):
+    if sort not in USER_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(USER_SORT_COLUMNS)}")
+    return USER_SORT_COLUMNS[sort]
+
+def serialize_user(user):
+    return {
         "id": user.id,
         "name": user.name,
         "email": user.email,
@@ -18,25 +67,143 @@ def get_users(admin: str = Depends(verify_admin_token), db: Session = Depends(da
         "company_name": user.company_name,
         "subdomain": user.subdomain,
         "created_at": user.created_at.isoformat() if user.created_at else None
-    } for user in users]
+    }
+
+@router.get("/")
+async def get_users(
+    request: Request,
+    response: Response,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    company_name: Optional[str] = None,
+    subdomain_prefix: Optional[str] = None,
+    admin: str = Depends(verify_admin_token),
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    """Get one page of registered users"""
+    etag = conditional.listing_etag(request, *await shared_state.call(shared_state.versions.snapshot, "users"))
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+    statement = filter_users(select(*USER_LISTING_COLUMNS), company_name, subdomain_prefix)
+    users, total, next_cursor = await paginate_async(db, statement, sort_column(sort), models.User.id, order == "desc", cursor, limit)
+    response.headers.update(conditional.cache_headers(etag))
+    return {
+        "items": [serialize_user(user) for user in users],
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor
+    }
+
+async def _remove_user_container(docker: AsyncDockerClient, container_name: str):
+    """Force-remove a tenant container; `rm -f` kills it, so no separate stop is needed"""
+    try:
+        await docker.remove(container_name, force=True)
+        return "container removed"
+    except docker_errors.NotFound:
+        return "no container"
+    except DockerException as e:
+        print(f"Docker API failed for container removal: {e}")
+    # Fallback to the docker CLI
+    result = await run_cli("rm", "-f", container_name, timeout=30)
+    if result.returncode == 0:
+        return "container removed"
+    if "No such container" in result.stderr:
+        return "no container"
+    raise RuntimeError(result.stderr.strip() or f"docker rm exited with {result.returncode}")
+
+async def _forget_users(user_ids):
+    """Update the in-memory views after users and their containers are gone"""
+    for user_id in user_ids:
+        registry.apply_summaries(f"chatbot_{user_id}", [])
+        await live_updates.relay.publish("user_deleted", {"id": user_id})
+    tenant_view.view.forget(user_ids)
+    await shared_state.call(shared_state.versions.bump, "users")
+    await stats.service.user_removed(len(user_ids))
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, admin: str = Depends(verify_admin_token), db: Session = Depends(database.get_db)):
+async def delete_user(user_id: int, admin: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_db), docker: AsyncDockerClient = Depends(get_async_docker)):
     """Delete a user and their associated container"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    import subprocess
     container_name = f"chatbot_{user_id}"
     
     try:
-        subprocess.run(["docker", "stop", container_name], capture_output=True)
-        subprocess.run(["docker", "rm", "-f", container_name], capture_output=True)
-    except:
-        pass
+        await _remove_user_container(docker, container_name)
+    except Exception as e:
+        print(f"Failed to remove container {container_name}: {e!r}")
+    await run_in_threadpool(port_allocator.allocator.release, user_id)
+    
+    await db.delete(user)
+    await db.commit()
+    await _forget_users([user_id])
+    
+    return {"success": True, "message": f"User {user.username} deleted successfully"}
+
+class BatchDelete(BaseModel):
+    user_ids: List[int]
+    concurrency: int = BATCH_DELETE_DEFAULT_CONCURRENCY
+    # Per-container budget in seconds
+    timeout: float = 30
+
+@router.post("/batch-delete")
+async def delete_users(request: BatchDelete, admin: str = Depends(verify_admin_token), db: AsyncSession = Depends(database.get_async_db), docker: AsyncDockerClient = Depends(get_async_docker)):
+    """Delete many users, tearing their containers down concurrently.
+
+    Users whose container could not be removed are kept so no container is
+    orphaned; the rest are deleted in a single transaction.
+    """
+    user_ids = list(dict.fromkeys(request.user_ids))
+    if not 1 <= len(user_ids) <= BATCH_DELETE_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"user_ids must contain between 1 and {BATCH_DELETE_MAX_USERS} ids")
+    if not 1 <= request.concurrency <= BATCH_DELETE_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {BATCH_DELETE_MAX_CONCURRENCY}")
+    
+    usernames = dict((await db.execute(
+        select(models.User.id, models.User.username).filter(models.User.id.in_(user_ids))
+    )).all())
+    # Return the connection to the pool while containers are torn down
+    await db.commit()
+    
+    semaphore = asyncio.Semaphore(request.concurrency)
+    
+    async def teardown(user_id):
+        container_name = f"chatbot_{user_id}"
+        async with semaphore:
+            try:
+                message = await asyncio.wait_for(_remove_user_container(docker, container_name), timeout=request.timeout)
+                return user_id, True, message
+            except asyncio.TimeoutError:
+                return user_id, False, f"container removal timed out after {request.timeout}s"
+            except Exception as e:
+                return user_id, False, f"container removal failed: {e}"
+    
+    outcomes = await asyncio.gather(*(teardown(user_id) for user_id in usernames))
+    removed = [user_id for user_id, success, _ in outcomes if success]
     
-    db.delete(user)
-    db.commit()
+    if removed:
+        await db.execute(delete(models.User).where(models.User.id.in_(removed)))
+        await db.commit()
+        await run_in_threadpool(port_allocator.allocator.release_many, removed)
+        await _forget_users(removed)
     
-    return {"success": True, "message": f"User {user.username} deleted successfully"}
\ No newline at end of file
+    results = {user_id: {"user_id": user_id, "success": False, "message": "user not found"} for user_id in user_ids}
+    for user_id, success, message in outcomes:
+        results[user_id] = {
+            "user_id": user_id,
+            "username": usernames[user_id],
+            "success": success,
+            "message": f"deleted ({message})" if success else message
+        }
+    return {
+        "results": list(results.values()),
+        "summary": {
+            "requested": len(user_ids),
+            "deleted": len(removed),
+            "failed": len(outcomes) - len(removed),
+            "not_found": len(user_ids) - len(outcomes)
+        }
+    }
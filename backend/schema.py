@@ -0,0 +1,43 @@
+"""
+Database schema management through the Alembic migrations in migrations/.
+
+upgrade() brings the database to the latest revision and replaces the
+Base.metadata.create_all call the API used to make at startup. New schema
+changes go in a new file under migrations/versions (`alembic revision -m
+"..."` from this directory).
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+import database
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def _config():
+    return Config(ALEMBIC_INI)
+
+
+def current_revision(engine=None):
+    with (engine or database.engine).connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def head_revision():
+    return ScriptDirectory.from_config(_config()).get_current_head()
+
+
+def upgrade(engine=None, revision: str = "head"):
+    """Apply pending migrations; returns (revision before, revision after)"""
+    engine = engine or database.engine
+    before = current_revision(engine)
+    config = _config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+    after = current_revision(engine)
+    if before != after:
+        print(f"Database migrated from {before or 'empty'} to {after}")
+    return before, after
@@ -0,0 +1,438 @@
+"""
+State shared by all worker processes of the API.
+
+`uvicorn main:app --workers N` (or WEB_CONCURRENCY=N) runs N copies of the
+app, each with its own memory. Whatever they must agree on lives behind a
+small key/value backend selected by SHARED_STATE_URL:
+
+    memory://                   this process only (the default, one worker)
+    sqlite:///path/state.db     workers on one host, through a local file
+    redis://host:6379/0         workers on any number of hosts (needs the redis package)
+
+Backends store strings with an optional expiry and offer atomic counters
+and compare-and-delete, which is enough for:
+
+    versions    data version counters (users, ports, admins) bumped on every
+                write; ETags and in-process caches compare them to notice
+                changes made by other workers
+    lock()      an expiring mutex, e.g. to run startup tasks one worker at a time
+    Leader      a renewed lease, so exactly one worker runs singleton duties
+
+Calls are synchronous: a dict lookup, an indexed SQLite read or one Redis
+round trip. Async code goes through call(), which runs them in the thread
+pool unless the backend is in memory, so a slow backend never stalls the
+event loop.
+"""
+import asyncio
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "memory://")
+# Namespace for keys in a Redis shared with other applications
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "admin-dashboard:")
+SHARED_STATE_TIMEOUT = float(os.getenv("SHARED_STATE_TIMEOUT", "5"))
+# Leader lease length; it is renewed every third of it (seconds)
+LEADER_TTL = float(os.getenv("LEADER_TTL", "15"))
+LOCK_POLL_INTERVAL = 0.1
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be taken in time"""
+
+
+class MemoryBackend:
+    kind = "memory"
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _value(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._value(key, time.time())
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.time()
+            return [self._value(key, now) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (str(value), time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """Set key only if it is absent; True if it was set"""
+        with self._lock:
+            now = time.time()
+            if self._value(key, now) is not None:
+                return False
+            self._data[key] = (str(value), now + ttl if ttl else None)
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            now = time.time()
+            value = int(self._value(key, now) or 0) + amount
+            expires_at = self._data[key][1] if key in self._data else None
+            self._data[key] = (str(value), expires_at)
+            return value
+
+    def adjust(self, key, amount):
+        """Add amount to an existing counter; None (and no change) if key is absent"""
+        with self._lock:
+            current = self._value(key, time.time())
+            if current is None:
+                return None
+            value = int(current) + amount
+            self._data[key] = (str(value), self._data[key][1])
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def renew_if(self, key, value, ttl):
+        """Extend key's expiry if it still holds value"""
+        with self._lock:
+            now = time.time()
+            if self._value(key, now) != value:
+                return False
+            self._data[key] = (value, now + ttl)
+            return True
+
+    def delete_if(self, key, value):
+        with self._lock:
+            if self._value(key, time.time()) != value:
+                return False
+            del self._data[key]
+            return True
+
+
+class SQLiteBackend:
+    """One table in a local SQLite file, for workers on the same host"""
+
+    kind = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        # WAL lets readers run while another worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; writes that read first use an explicit transaction
+            conn = sqlite3.connect(self.path, timeout=SHARED_STATE_TIMEOUT, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _purge(self, conn, key, now):
+        conn.execute("DELETE FROM shared_state WHERE key = ? AND expires_at <= ?", (key, now))
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        rows = dict(self._conn().execute(
+            f"SELECT key, value FROM shared_state WHERE key IN ({','.join('?' * len(keys))}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time())
+        ).fetchall())
+        return [rows.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, str(value), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._transaction() as conn:
+            self._purge(conn, key, now)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(value), now + ttl if ttl else None)
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key, amount=1):
+        with self._transaction() as conn:
+            self._purge(conn, key, time.time())
+            conn.execute(
+                "INSERT INTO shared_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+                (key, str(amount), amount)
+            )
+            return int(conn.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()[0])
+
+    def adjust(self, key, amount):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shared_state SET value = CAST(value AS INTEGER) + ? "
+                "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (amount, key, time.time())
+            )
+            if cursor.rowcount == 0:
+                return None
+            return int(conn.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()[0])
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def renew_if(self, key, value, ttl):
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE shared_state SET expires_at = ? WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (now + ttl, key, value, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete_if(self, key, value):
+        cursor = self._conn().execute("DELETE FROM shared_state WHERE key = ? AND value = ?", (key, value))
+        return cursor.rowcount == 1
+
+
+# KEYS[1] key; ARGV[1] amount
+_ADJUST = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('incrby', KEYS[1], ARGV[1])
+end
+return false
+"""
+# KEYS[1] key; ARGV[1] expected value, ARGV[2] ttl in ms
+_RENEW_IF = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_DELETE_IF = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Any Redis-protocol server (Redis, Valkey, KeyDB, ...)"""
+
+    kind = "redis"
+
+    def __init__(self, url: str, prefix: str = SHARED_STATE_PREFIX):
+        if redis is None:
+            raise RuntimeError("SHARED_STATE_URL points at Redis but the redis package is not installed")
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(
+            url,
+            decode_responses=True,
+            socket_timeout=SHARED_STATE_TIMEOUT,
+            socket_connect_timeout=SHARED_STATE_TIMEOUT
+        )
+        self._adjust = self._redis.register_script(_ADJUST)
+        self._renew_if = self._redis.register_script(_RENEW_IF)
+        self._delete_if = self._redis.register_script(_DELETE_IF)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    @staticmethod
+    def _ms(ttl):
+        return int(ttl * 1000) if ttl else None
+
+    def get(self, key):
+        return self._redis.get(self._key(key))
+
+    def get_many(self, keys):
+        return self._redis.mget([self._key(key) for key in keys])
+
+    def set(self, key, value, ttl=None):
+        self._redis.set(self._key(key), str(value), px=self._ms(ttl))
+
+    def add(self, key, value, ttl=None):
+        return bool(self._redis.set(self._key(key), str(value), px=self._ms(ttl), nx=True))
+
+    def incr(self, key, amount=1):
+        return self._redis.incrby(self._key(key), amount)
+
+    def adjust(self, key, amount):
+        return self._adjust(keys=[self._key(key)], args=[amount])
+
+    def delete(self, key):
+        self._redis.delete(self._key(key))
+
+    def renew_if(self, key, value, ttl):
+        return bool(self._renew_if(keys=[self._key(key)], args=[value, self._ms(ttl)]))
+
+    def delete_if(self, key, value):
+        return bool(self._delete_if(keys=[self._key(key)], args=[value]))
+
+
+async def call(func, *args):
+    """Run a shared-state call (e.g. versions.get) from async code"""
+    if backend.kind == MemoryBackend.kind:
+        return func(*args)
+    return await run_in_threadpool(func, *args)
+
+
+def create_backend(url: str):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+class DataVersions:
+    """Write counters shared by all workers"""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def bump(self, name: str):
+        """Record a write to name; returns the new version"""
+        return self._backend.incr(f"version:{name}")
+
+    def get(self, name: str):
+        return int(self._backend.get(f"version:{name}") or 0)
+
+    def snapshot(self, *names):
+        """(epoch, version of each name) in one call.
+
+        The epoch changes whenever the counters may have started over (a new
+        in-memory backend, a flushed Redis), so values from before and after
+        never look alike.
+        """
+        values = self._backend.get_many(["version:epoch"] + [f"version:{name}" for name in names])
+        epoch = values[0]
+        if epoch is None:
+            self._backend.add("version:epoch", secrets.token_hex(4))
+            epoch = self._backend.get("version:epoch")
+        return (epoch,) + tuple(int(value or 0) for value in values[1:])
+
+
+@contextmanager
+def lock(name: str, ttl: float = 60, wait: float = 60):
+    """Hold name across all workers; the lock expires after ttl seconds in case its holder dies"""
+    token = secrets.token_hex(8)
+    key = f"lock:{name}"
+    deadline = time.monotonic() + wait
+    while not backend.add(key, token, ttl):
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"Timed out after {wait}s waiting for lock {name}")
+        time.sleep(LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        backend.delete_if(key, token)
+
+
+class Leader:
+    """Lease-based leader election: at most one worker holds the lease at a time.
+
+    The holder renews it every ttl/3; if it dies, another worker takes over
+    once the lease has expired.
+    """
+
+    def __init__(self, name: str, ttl: float = LEADER_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+        # Times this worker took the lease (renewals do not count)
+        self.terms = 0
+        self._key = f"leader:{name}"
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+    def try_acquire(self):
+        """Renew the lease if held, take it if free; returns whether this worker leads"""
+        # Renew even when not sure we hold it: after a failed renewal the lease may still be ours
+        if backend.renew_if(self._key, self._token, self.ttl):
+            self.is_leader = True
+            return True
+        self.is_leader = backend.add(self._key, self._token, self.ttl)
+        if self.is_leader:
+            self.terms += 1
+        return self.is_leader
+
+    def resign(self):
+        self.is_leader = False
+        backend.delete_if(self._key, self._token)
+
+    def holder(self):
+        return backend.get(self._key)
+
+    async def maintain(self, on_elected=None):
+        """Keep the lease (or keep trying to get it) until cancelled; awaits on_elected() each time it is taken"""
+        while True:
+            was_leader = self.is_leader
+            terms = self.terms
+            try:
+                await run_in_threadpool(self.try_acquire)
+            except Exception as e:
+                # Without the backend we cannot know whether someone else took over
+                print(f"Leader election for {self.name} failed: {e}")
+                self.is_leader = False
+            if self.terms != terms:
+                print(f"Worker {os.getpid()} is now the {self.name} leader")
+                if on_elected is not None:
+                    try:
+                        await on_elected()
+                    except Exception as e:
+                        print(f"Leader duties for {self.name} failed: {e}")
+            elif was_leader != self.is_leader:
+                print(f"Worker {os.getpid()} {'is again' if self.is_leader else 'is no longer'} the {self.name} leader")
+            await asyncio.sleep(self.ttl / 3)
+
+    def status(self):
+        return {"is_leader": self.is_leader, "holder": self.holder()}
+
+
+backend = create_backend(SHARED_STATE_URL)
+versions = DataVersions(backend)
@@ -0,0 +1,78 @@
+"""
+Dashboard statistics served from in-memory counters.
+
+The user counter is seeded from MySQL once and then adjusted by
+registration and user deletion (with a periodic recount to correct any
+drift). It is kept in shared_state, so every worker adjusts and serves
+the same number. Container counters are recomputed only when the container registry
+reports a change. Responses carry an ETag and a max-age so repeat polls
+are answered without touching MySQL or Docker.
+"""
+import hashlib
+import json
+import os
+from sqlalchemy import func, select
+import models
+import shared_state
+from container_registry import registry
+
+# Cache-Control max-age for the stats response (seconds)
+STATS_MAX_AGE = int(os.getenv("STATS_MAX_AGE", "10"))
+# Recount users from the database at most this often (seconds)
+USER_RECOUNT_INTERVAL = int(os.getenv("STATS_USER_RECOUNT_INTERVAL", "300"))
+# Expires after USER_RECOUNT_INTERVAL, which triggers the recount
+TOTAL_USERS_KEY = "stats:total_users"
+
+
+class StatsService:
+    def __init__(self):
+        self._container_version = None
+        self._container_counts = (0, 0, False)
+
+    async def user_added(self, count: int = 1):
+        # No-op until the first count; that count includes the new users
+        await shared_state.call(shared_state.backend.adjust, TOTAL_USERS_KEY, count)
+
+    async def user_removed(self, count: int = 1):
+        await shared_state.call(shared_state.backend.adjust, TOTAL_USERS_KEY, -count)
+
+    async def _users(self, db):
+        cached = await shared_state.call(shared_state.backend.get, TOTAL_USERS_KEY)
+        if cached is not None:
+            return max(0, int(cached))
+        total_users = await db.scalar(select(func.count(models.User.id)))
+        await shared_state.call(shared_state.backend.set, TOTAL_USERS_KEY, total_users, USER_RECOUNT_INTERVAL)
+        return total_users
+
+    def _containers(self):
+        version = registry.version
+        if version != self._container_version:
+            self._container_counts = registry.counts()
+            self._container_version = version
+        return self._container_counts
+
+    async def get(self, db):
+        """Current dashboard stats; db (an AsyncSession) is only queried when the user count needs a recount"""
+        total_users = await self._users(db)
+        running_containers, total_containers, docker_available = self._containers()
+
+        # If Docker is not available, show expected containers based on users
+        if not docker_available:
+            total_containers = total_users  # Each user should have a container
+            running_containers = 0  # Can't determine without Docker
+
+        return {
+            "total_users": total_users,
+            "running_containers": running_containers,
+            "total_containers": total_containers,
+            "stopped_containers": max(0, total_containers - running_containers),
+            "docker_available": docker_available
+        }
+
+
+def etag_for(data):
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'"{digest[:16]}"'
+
+
+service = StatsService()
@@ -0,0 +1,158 @@
+"""
+Fan-out of upstream Docker streams to many clients.
+
+When several admins watch the same container, one upstream stream (logs or
+stats) is opened and its items are copied into a bounded queue per client.
+A client that falls behind loses its oldest items instead of slowing the
+others down or growing memory; it is told how many items it missed. The
+upstream stream is closed when the last client leaves.
+"""
+import asyncio
+import json
+import os
+
+# Items buffered per client before the oldest ones are dropped
+CLIENT_QUEUE_SIZE = int(os.getenv("STREAM_CLIENT_QUEUE_SIZE", "256"))
+# Comment sent on idle SSE connections so proxies keep them open (seconds)
+SSE_KEEPALIVE_INTERVAL = int(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+
+_END = object()
+
+
+class Dropped:
+    """Marker delivered to a client that missed `count` items"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, item):
+        if self.queue.full():
+            # Slow client: discard its oldest item rather than block the upstream
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+
+class _Broadcast:
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+
+
+class StreamHub:
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._broadcasts = {}
+
+    def active(self):
+        """Open upstream streams and how many clients each one serves"""
+        return {repr(key): len(broadcast.subscribers) for key, broadcast in self._broadcasts.items()}
+
+    async def subscribe(self, key, factory, backlog=None):
+        """Yield items from the shared upstream for key, starting it with factory() if needed.
+
+        factory must return an async iterator. Upstream errors are re-raised
+        in every subscriber. backlog, if given, also returns an async iterator:
+        its items go to this subscriber first, while the upstream's queue up.
+        """
+        broadcast = self._broadcasts.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._broadcasts[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, factory))
+        subscriber = _Subscriber(self.queue_size)
+        broadcast.subscribers.add(subscriber)
+        try:
+            if backlog is not None:
+                async for item in backlog():
+                    yield item
+            while True:
+                item = await subscriber.queue.get()
+                if subscriber.dropped:
+                    yield Dropped(subscriber.dropped)
+                    subscriber.dropped = 0
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            broadcast.subscribers.discard(subscriber)
+            if not broadcast.subscribers:
+                # Detach now so a client arriving meanwhile starts a fresh upstream
+                if self._broadcasts.get(key) is broadcast:
+                    del self._broadcasts[key]
+                broadcast.task.cancel()
+
+    async def _pump(self, key, broadcast, factory):
+        try:
+            async for item in factory():
+                for subscriber in list(broadcast.subscribers):
+                    subscriber.offer(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            for subscriber in list(broadcast.subscribers):
+                subscriber.offer(e)
+        finally:
+            if self._broadcasts.get(key) is broadcast:
+                del self._broadcasts[key]
+            for subscriber in list(broadcast.subscribers):
+                subscriber.offer(_END)
+
+
+def sse_event(data: str, event: str = None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(source, encode, keepalive: int = SSE_KEEPALIVE_INTERVAL):
+    """Turn an async iterator into Server-Sent Events text.
+
+    encode(item) returns the SSE text for one item. Idle periods produce
+    keepalive comments, Dropped markers become `dropped` events and a
+    Docker failure mid-stream ends the stream with an `error` event.
+    """
+    iterator = source.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=keepalive)
+            if not done:
+                yield ": keepalive\n\n"
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                yield sse_event(str(e) or type(e).__name__, event="error")
+                return
+            if isinstance(item, Dropped):
+                yield sse_event(json.dumps({"count": item.count}), event="dropped")
+            else:
+                yield encode(item)
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        if not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+hub = StreamHub()
@@ -0,0 +1,155 @@
+"""
+Pre-encoded tenant rows for the container listing.
+
+Every listing row merges a user's columns with its container's registry
+entry and host port. Building those dicts, isoformat()-ing timestamps and
+walking them with jsonable_encoder costs more CPU than the queries once
+pages get large, so TenantView keeps each tenant's row already encoded as
+JSON bytes and only rebuilds it when one of its inputs changed:
+
+    the user's listing columns    compared with the row the page query returned
+    the container entry           compared with the registry snapshot
+    the allocated port            compared with the port allocator
+    docker availability
+
+Those checks are cheap tuple/dict comparisons, and because they run
+against the inputs of the current request a cached row can never be
+staler than the data the handler would otherwise have serialized.
+
+Responses are streamed by concatenating cached bytes, as the usual object
+format or as a compact columnar one (one array per field, keys sent once).
+orjson is used when installed; the stdlib json module otherwise.
+"""
+import os
+import threading
+from fastapi.responses import StreamingResponse
+import instrumentation
+import port_allocator
+
+try:
+    import orjson
+
+    def encode(value) -> bytes:
+        return orjson.dumps(value)
+except ImportError:
+    import json
+
+    def encode(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+# Entries beyond this are dropped wholesale; they are rebuilt on demand
+TENANT_VIEW_MAX_ROWS = int(os.getenv("TENANT_VIEW_MAX_ROWS", "200000"))
+# Rows per chunk written to the socket
+TENANT_VIEW_CHUNK_ROWS = int(os.getenv("TENANT_VIEW_CHUNK_ROWS", "100"))
+
+CONTAINER_FIELDS = ("id", "name", "image", "status", "ports", "created", "docker_available")
+USER_FIELDS = ("id", "name", "email", "username", "company_name", "subdomain", "created_at")
+# Columnar field names; user fields are prefixed to keep them apart from the container's
+COLUMNS = CONTAINER_FIELDS + tuple(f"user_{field}" for field in USER_FIELDS)
+
+
+def _placeholder(container_name, status, port):
+    return {
+        "id": "N/A",
+        "name": container_name,
+        "image": "nginx:alpine",
+        "status": status,
+        "ports": f"{port}:80" if port else "N/A",
+        "created": "N/A"
+    }
+
+
+class _Row:
+    __slots__ = ("user", "container", "port", "docker_available", "encoded", "values")
+
+    def __init__(self, user, container, port, docker_available, encoded, values):
+        self.user = user
+        self.container = container
+        self.port = port
+        self.docker_available = docker_available
+        self.encoded = encoded
+        self.values = values
+
+
+class TenantView:
+    def __init__(self, max_rows: int = TENANT_VIEW_MAX_ROWS):
+        self.max_rows = max_rows
+        self._rows = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+
+    def _build(self, user, container, port, docker_available):
+        user_info = {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "username": user.username,
+            "company_name": user.company_name,
+            "subdomain": user.subdomain,
+            "created_at": user.created_at.isoformat() if user.created_at else None
+        }
+        if container is None:
+            container_name = f"chatbot_{user.id}"
+            container = _placeholder(container_name, "not_created" if docker_available else "docker_unavailable", port)
+        row = {**container, "docker_available": docker_available, "user_info": user_info}
+        values = tuple(encode(row.get(field)) for field in CONTAINER_FIELDS) + \
+            tuple(encode(user_info[field]) for field in USER_FIELDS)
+        return encode(row), values
+
+    def rows(self, users, docker_containers, docker_available):
+        """Cached rows for users (listing rows, in page order), rebuilding the stale ones"""
+        result = []
+        with self._lock, instrumentation.timed("serialize"):
+            if len(self._rows) > self.max_rows:
+                self._rows.clear()
+            for user in users:
+                key = tuple(user)
+                # Containers are only consulted while the daemon is reachable
+                container = docker_containers.get(f"chatbot_{user.id}") if docker_available else None
+                port = port_allocator.allocator.port_for(user.id)
+                row = self._rows.get(user.id)
+                if (row is not None and row.user == key and row.container == container
+                        and row.port == port and row.docker_available == docker_available):
+                    self.hits += 1
+                else:
+                    self.rebuilds += 1
+                    encoded, values = self._build(user, container, port, docker_available)
+                    row = _Row(key, container, port, docker_available, encoded, values)
+                    self._rows[user.id] = row
+                result.append(row)
+        return result
+
+    def forget(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._rows.pop(user_id, None)
+
+    def status(self):
+        with self._lock:
+            return {"rows": len(self._rows), "hits": self.hits, "rebuilds": self.rebuilds}
+
+
+def listing_response(rows, meta: dict, columnar: bool = False, headers: dict = None):
+    """Stream {"items": [...], **meta}, or {"format": "columnar", "columns": {field: [...]}, **meta}"""
+    # meta is never empty, so its encoding is '{...}' and can follow a comma
+    tail = encode(meta)[1:]
+
+    async def body():
+        if not columnar:
+            yield b'{"items":['
+            for start in range(0, len(rows), TENANT_VIEW_CHUNK_ROWS):
+                chunk = b",".join(row.encoded for row in rows[start:start + TENANT_VIEW_CHUNK_ROWS])
+                yield (b"," + chunk) if start else chunk
+            yield b"]," + tail
+            return
+        yield b'{"format":"columnar","columns":{'
+        for position, field in enumerate(COLUMNS):
+            yield (b"," if position else b"") + encode(field) + b":[" + \
+                b",".join(row.values[position] for row in rows) + b"]"
+        yield b"}," + tail
+
+    return StreamingResponse(body(), media_type="application/json", headers=headers)
+
+
+view = TenantView()
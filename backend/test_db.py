@@ -10,7 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import test_database_connection, engine
 from sqlalchemy import text
-import models
+import schema
 
 def main():
     print("=" * 50)
@@ -26,10 +26,10 @@ def main():
         return False
     
     # Test table creation
-    print("\n2. Testing table creation...")
+    print("\n2. Testing schema migrations...")
     try:
-        models.Base.metadata.create_all(bind=engine)
-        print("   ✓ Tables created/verified successfully")
+        schema.upgrade()
+        print("   ✓ Tables migrated/verified successfully")
     except Exception as e:
         print(f"   ✗ Table creation failed: {e}")
         return False
@@ -3,9 +3,8 @@
 Test script to verify Docker connectivity and container visibility
 """
 import docker
-import subprocess
-import json
 from docker.errors import DockerException
+import docker_cli
 
 def test_docker_api():
     """Test Docker Python API connectivity"""
@@ -30,37 +29,16 @@ def test_docker_subprocess():
     """Test Docker subprocess commands"""
     print("\nTesting Docker subprocess commands...")
     try:
-        result = subprocess.run(
-            ["docker", "ps", "-a", "--format", "json"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if result.returncode == 0 and result.stdout.strip():
-            containers = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    try:
-                        container_data = json.loads(line)
-                        name = container_data.get("Names", "")
-                        if name.startswith('chatbot_'):
-                            containers.append({
-                                "name": name,
-                                "status": container_data.get("State", ""),
-                                "id": container_data.get("ID", "")[:12]
-                            })
-                    except json.JSONDecodeError:
-                        continue
-            
-            print(f"✓ Docker subprocess working - Found {len(containers)} chatbot containers")
-            for container in containers:
-                print(f"  - {container['name']}: {container['status']} ({container['id']})")
-            
-            return True, len(containers)
-        else:
-            print(f"✗ Docker subprocess failed: {result.stderr}")
+        containers = docker_cli.driver.list_containers("chatbot_")
+        if containers is None:
+            print("✗ Docker subprocess failed: docker ps did not succeed")
             return False, 0
+        
+        print(f"✓ Docker subprocess working - Found {len(containers)} chatbot containers")
+        for container in containers.values():
+            print(f"  - {container['name']}: {container['status']} ({container['id']})")
+        
+        return True, len(containers)
             
     except Exception as e:
         print(f"✗ Docker subprocess failed: {e}")
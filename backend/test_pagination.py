@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Pagination Walk Test
+Follows next_cursor through the users listing for each sort column and
+order and fails unless every row comes back exactly once, in order.
+
+Run it against the configured database after migrating, or against SQLite:
+    DATABASE_TEST_MODE=1 python test_pagination.py
+Test users are inserted inside a transaction that is rolled back.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, select
+import database
+import models
+import schema
+from pagination import _keyset, _page
+from routers.users import USER_LISTING_COLUMNS, filter_users, sort_column
+
+PREFIX = "pagewalk-"
+PAGE_SIZE = 4
+
+def seed_users(connection):
+    """Users sharing created_at values (ties are broken by id), some stamped by the database itself"""
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    rows = [{
+        "name": f"Walk User {i % 5}",
+        "email": f"{PREFIX}{i}@example.com",
+        "phone": "0000000000",
+        "username": f"{PREFIX}{i}",
+        "password": "x",
+        "company_name": f"Company {i % 3}",
+        "subdomain": f"{PREFIX}{i}",
+    } for i in range(23)]
+    for i, row in enumerate(rows[:15]):
+        row["created_at"] = base + timedelta(seconds=i // 3)
+    connection.execute(insert(models.User), rows[:15])
+    # server_default=now(), in the database's own storage format
+    connection.execute(insert(models.User), rows[15:])
+
+def walk(connection, sort, descending):
+    """Ids in the order the pages return them; stops if a cursor repeats"""
+    ids, cursors, cursor = [], set(), None
+    column = sort_column(sort)
+    while True:
+        statement = _keyset(filter_users(select(*USER_LISTING_COLUMNS), None, PREFIX),
+                            column, models.User.id, descending, cursor, PAGE_SIZE)
+        rows, cursor = _page(connection.execute(statement).all(), column, models.User.id, PAGE_SIZE)
+        ids.extend(row.id for row in rows)
+        if cursor is None:
+            return ids
+        if cursor in cursors:
+            raise RuntimeError(f"cursor repeated after {len(ids)} rows")
+        cursors.add(cursor)
+
+def expected(connection, sort, descending):
+    column = sort_column(sort)
+    order = (column.desc(), models.User.id.desc()) if descending else (column.asc(), models.User.id.asc())
+    statement = filter_users(select(models.User.id), None, PREFIX).order_by(*order)
+    return [row.id for row in connection.execute(statement)]
+
+def main():
+    print("=" * 50)
+    print("🔍 Pagination Walk Test")
+    print("=" * 50)
+
+    schema.upgrade()
+    failures = 0
+    with database.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            seed_users(connection)
+            for sort in ("created_at", "name", "id"):
+                for descending in (False, True):
+                    description = f"{sort} {'desc' if descending else 'asc'}"
+                    try:
+                        ids = walk(connection, sort, descending)
+                    except RuntimeError as e:
+                        failures += 1
+                        print(f"   ✗ {description}: {e}")
+                        continue
+                    if ids != expected(connection, sort, descending):
+                        failures += 1
+                        print(f"   ✗ {description}: got {len(ids)} rows out of order or missing")
+                    else:
+                        print(f"   ✓ {description}: {len(ids)} rows")
+        finally:
+            transaction.rollback()
+
+    print("\n" + "=" * 50)
+    if failures:
+        print(f"❌ {failures} listings do not page through cleanly")
+    else:
+        print("🎉 Every listing pages through each row once")
+    print("=" * 50)
+    return failures == 0
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Provisioning Recovery Test
+Runs the provisioning queues of two API workers against SQLite and the fake
+Docker daemon and checks that every tenant container is created exactly once:
+
+    worker A    registers tenants (enqueues their jobs) and runs them
+    worker B    is elected leader while A is still running its jobs and
+                recovers what it finds, including a job left running by a
+                worker that died; a job abandoned later, while B still
+                leads, is picked up by B's periodic check
+
+    python test_provisioning.py
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TENANTS = 12
+ABANDONED_USER_ID = TENANTS + 1
+# Abandoned after the election
+LATE_USER_ID = TENANTS + 2
+
+
+def configure_environment(workdir):
+    """Must run before the app modules are imported"""
+    os.environ["DATABASE_TEST_MODE"] = "1"
+    os.environ["DATABASE_TEST_PATH"] = os.path.join(workdir, "provisioning.db")
+    os.environ["DOCKER_HOST"] = "unix://" + os.path.join(workdir, "docker.sock")
+    os.environ["SHARED_STATE_URL"] = "sqlite:///" + os.path.join(workdir, "shared_state.db")
+    os.environ["LEADER_TTL"] = "3"
+    os.environ["PROVISIONING_RECOVER_INTERVAL"] = "1"
+
+
+async def run_worker(role, user_ids):
+    import provisioning
+    import shared_state
+
+    if role == "register":
+        await provisioning.queue.start()
+        for user_id in user_ids:
+            await provisioning.queue.enqueue(user_id)
+    else:
+        leader = shared_state.Leader("api")
+        await provisioning.queue.start(leader)
+        asyncio.create_task(leader.maintain(on_elected=provisioning.queue.recover))
+    # Until the test stops us
+    await asyncio.Event().wait()
+
+
+def seed_database():
+    from sqlalchemy import insert
+    import database
+    import models
+    import schema
+
+    schema.upgrade()
+    with database.engine.begin() as connection:
+        connection.execute(insert(models.User), [{
+            "name": f"Tenant {i}",
+            "email": f"tenant{i}@example.com",
+            "phone": "0000000000",
+            "username": f"tenant_{i}",
+            "password": "x",
+            "company_name": "Test",
+            "subdomain": f"tenant-{i}",
+        } for i in range(1, LATE_USER_ID + 1)])
+    abandon_job("abandoned", ABANDONED_USER_ID)
+
+
+def abandon_job(job_id, user_id):
+    """Record a job claimed an hour ago by a worker that is gone"""
+    from sqlalchemy import insert, text
+    import database
+    import models
+    import provisioning
+
+    with database.engine.begin() as connection:
+        connection.execute(insert(models.ProvisioningJob).values(
+            id=job_id, user_id=user_id, status=provisioning.JOB_RUNNING, attempts=1
+        ))
+        connection.execute(text("UPDATE provisioning_jobs SET updated_at = datetime('now', '-1 hour') WHERE id = :id"),
+                           {"id": job_id})
+
+
+def job_statuses():
+    import database
+    import models
+
+    db = database.SessionLocal()
+    try:
+        return dict(db.query(models.ProvisioningJob.user_id, models.ProvisioningJob.status).all())
+    finally:
+        db.close()
+
+
+def wait_for(condition, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def start_worker(role, user_ids=()):
+    return subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--worker", role, *map(str, user_ids)
+    ], cwd=BACKEND_DIR)
+
+
+def main():
+    import httpx
+    from benchmarks.run import stop, wait_until_ready
+
+    print("=" * 50)
+    print("🔍 Provisioning Recovery Test")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir)
+        socket_path = os.path.join(workdir, "docker.sock")
+        daemon = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_docker", "--socket", socket_path,
+            "--containers", "0", "--latency-ms", "150", "--jitter", "0"
+        ], cwd=BACKEND_DIR)
+        workers = []
+        try:
+            wait_until_ready(daemon, "http://docker/_ping", transport=httpx.HTTPTransport(uds=socket_path))
+            seed_database()
+            import provisioning
+
+            workers.append(start_worker("register", range(1, TENANTS + 1)))
+            print("1. Waiting for worker A to start running jobs...")
+            if not wait_for(lambda: provisioning.JOB_RUNNING in [
+                status for user_id, status in job_statuses().items() if user_id != ABANDONED_USER_ID
+            ]):
+                print("   ✗ Worker A never claimed a job")
+                return False
+            print("   ✓ Worker A is running jobs")
+
+            print("\n2. Electing worker B while A is busy...")
+            workers.append(start_worker("leader"))
+            finished = (provisioning.JOB_SUCCEEDED, provisioning.JOB_FAILED)
+            if not wait_for(lambda: len(job_statuses()) == ABANDONED_USER_ID and all(
+                status in finished for status in job_statuses().values()
+            )):
+                print(f"   ✗ Jobs did not finish: {job_statuses()}")
+                return False
+            print("   ✓ Every job finished")
+
+            print("\n3. Checking each container was created once...")
+            with httpx.Client(transport=httpx.HTTPTransport(uds=socket_path)) as client:
+                creates = client.get("http://docker/_bench/stats").json()["creates"]
+            failures = 0
+            for user_id, status in sorted(job_statuses().items()):
+                count = creates.get(f"chatbot_{user_id}", 0)
+                if status != provisioning.JOB_SUCCEEDED or count != 1:
+                    failures += 1
+                    print(f"   ✗ chatbot_{user_id}: job {status}, created {count} times")
+            if failures:
+                return False
+            print(f"   ✓ {ABANDONED_USER_ID} containers, each created once (abandoned job included)")
+
+            print("\n4. Abandoning a job while worker B leads...")
+            import shared_state
+            holder = shared_state.backend.get("leader:api")
+            abandon_job("abandoned-late", LATE_USER_ID)
+            if not wait_for(lambda: job_statuses().get(LATE_USER_ID) in finished, timeout=30):
+                print(f"   ✗ Job was not recovered: {job_statuses().get(LATE_USER_ID)}")
+                return False
+            with httpx.Client(transport=httpx.HTTPTransport(uds=socket_path)) as client:
+                count = client.get("http://docker/_bench/stats").json()["creates"].get(f"chatbot_{LATE_USER_ID}", 0)
+            if job_statuses()[LATE_USER_ID] != provisioning.JOB_SUCCEEDED or count != 1:
+                print(f"   ✗ chatbot_{LATE_USER_ID}: job {job_statuses()[LATE_USER_ID]}, created {count} times")
+                return False
+            if shared_state.backend.get("leader:api") != holder:
+                print("   ✗ Leadership changed, so this was not the periodic check")
+                return False
+            print("   ✓ Re-queued by the sitting leader, created once")
+        finally:
+            for process in workers + [daemon]:
+                stop(process)
+
+    print("\n" + "=" * 50)
+    print("🎉 Provisioning recovery test passed")
+    print("=" * 50)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker", choices=["register", "leader"], help=argparse.SUPPRESS)
+    parser.add_argument("user_ids", nargs="*", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        try:
+            asyncio.run(run_worker(args.worker, args.user_ids))
+        except KeyboardInterrupt:
+            pass
+    elif not main():
+        sys.exit(1)
@@ -6,6 +6,9 @@ import Registration from './Registration';
 import AdminManagement from './AdminManagement';
 import { AlertModal } from '../components/Modal';
 
+// Listings are paginated server-side; the dashboard shows the first page
+const PAGE_SIZE = 500;
+
 const Dashboard = ({ setIsAuthenticated }) => {
   const [activeSection, setActiveSection] = useState('dashboard');
   const [containers, setContainers] = useState([]);
@@ -23,14 +26,14 @@ const Dashboard = ({ setIsAuthenticated }) => {
       const headers = { Authorization: `Bearer ${token}` };
       
       const [containersRes, usersRes, statsRes, profileRes] = await Promise.all([
-        axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/containers/`, { headers }),
-        axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/users/`, { headers }),
+        axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/containers/`, { headers, params: { limit: PAGE_SIZE } }),
+        axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/users/`, { headers, params: { limit: PAGE_SIZE } }),
         axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/admin/stats`, { headers }),
         axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/profile/me`, { headers })
       ]);
       
-      setContainers(containersRes.data);
-      setUsers(usersRes.data);
+      setContainers(containersRes.data.items);
+      setUsers(usersRes.data.items);
       setStats(statsRes.data);
       setCurrentUser(profileRes.data.username);
     } catch (err) {
@@ -47,8 +50,92 @@ const Dashboard = ({ setIsAuthenticated }) => {
     }
   };
 
+  // Lists are loaded once; after that the backend pushes changes as they happen
   useEffect(() => {
-    fetchData();
+    const token = localStorage.getItem('adminToken');
+    const source = new EventSource(
+      `${import.meta.env.VITE_BACKEND_URL}/api/live/stream?token=${encodeURIComponent(token)}`
+    );
+    let loaded = false;
+    let statsTimer = null;
+
+    const reload = () => {
+      loaded = true;
+      fetchData();
+    };
+
+    // Several changes usually arrive together; refresh the counters once
+    const refreshStats = () => {
+      clearTimeout(statsTimer);
+      statsTimer = setTimeout(async () => {
+        try {
+          const statsRes = await axios.get(`${import.meta.env.VITE_BACKEND_URL}/api/admin/stats`, {
+            headers: { Authorization: `Bearer ${token}` }
+          });
+          setStats(statsRes.data);
+        } catch (err) {
+          // The next change or reset will try again
+        }
+      }, 1000);
+    };
+
+    const emptyContainer = (user, dockerAvailable) => ({
+      id: 'N/A',
+      name: `chatbot_${user.id}`,
+      image: 'nginx:alpine',
+      status: dockerAvailable ? 'not_created' : 'docker_unavailable',
+      ports: 'N/A',
+      created: 'N/A',
+      docker_available: dockerAvailable,
+      user_info: user
+    });
+
+    source.addEventListener('ready', reload);
+    source.addEventListener('reset', reload);
+
+    source.addEventListener('container', (event) => {
+      const { name, container, docker_available } = JSON.parse(event.data);
+      setContainers(prev => prev.map(row => (
+        row.name === name
+          ? { ...emptyContainer(row.user_info, docker_available), ...container, docker_available }
+          : row
+      )));
+      refreshStats();
+    });
+
+    source.addEventListener('docker', (event) => {
+      const { docker_available } = JSON.parse(event.data);
+      setContainers(prev => prev.map(row => ({ ...row, docker_available })));
+      refreshStats();
+    });
+
+    source.addEventListener('user_added', (event) => {
+      const { user } = JSON.parse(event.data);
+      setUsers(prev => (prev.some(u => u.id === user.id) ? prev : [...prev, user]));
+      setContainers(prev => (
+        prev.some(row => row.user_info.id === user.id) ? prev : [...prev, emptyContainer(user, true)]
+      ));
+      refreshStats();
+    });
+
+    source.addEventListener('user_deleted', (event) => {
+      const { id } = JSON.parse(event.data);
+      setUsers(prev => prev.filter(u => u.id !== id));
+      setContainers(prev => prev.filter(row => row.user_info.id !== id));
+      refreshStats();
+    });
+
+    source.onerror = () => {
+      // EventSource reconnects by itself; only make sure the page is not left empty
+      if (!loaded) {
+        reload();
+      }
+    };
+
+    return () => {
+      clearTimeout(statsTimer);
+      source.close();
+    };
   }, []);
 
   const handleLogout = () => {